@@ -0,0 +1,187 @@
+"""
+Cohort analytics cube.
+
+Grade counts are kept per (course, exam, subject) as one row of a counts matrix with a
+column per grade in GRADE_ORDER. Pass rates, grade-point means and spreads and grade
+percentiles are derived for every row at once with NumPy and kept next to the counts.
+Lookups by course, exam or subject go through small dimension indexes, so a dashboard
+slices the cube without touching student rows. Refreshing from the results store only
+adds or replaces the rows of newly saved sheets; a revised upload replaces the row of
+the sheet it supersedes, and sheets without course/exam/subject keep a row each.
+"""
+from threading import RLock
+
+import numpy as np
+import pandas as pd
+
+from grades import ABSENT_GRADE, GRADE_ORDER
+from revisions import is_identified
+from transcripts import GRADE_POINTS
+
+DIMENSIONS = ('course', 'exam', 'subject')
+PASS_GRADE = 'C'
+PERCENTILES = (25, 50, 75)
+
+# Per GRADE_ORDER column: grade points (NaN for AB), graded and passing grades
+POINTS = np.array([GRADE_POINTS.get(grade, np.nan) for grade in GRADE_ORDER])
+GRADED = ~np.isnan(POINTS)
+PASSED = GRADED & (np.arange(len(GRADE_ORDER)) >= GRADE_ORDER.index(PASS_GRADE))
+ABSENT_INDEX = GRADE_ORDER.index(ABSENT_GRADE)
+GRADE_INDEX = {grade: i for i, grade in enumerate(GRADE_ORDER)}
+
+STAT_COLUMNS = ['Students', 'Sat', 'Absent', 'Passed', 'Pass Rate %', 'Mean GP', 'Std GP'] + \
+    [f'P{p}' for p in PERCENTILES]
+
+
+def row_statistics(counts):
+    """Statistics of every row of a (rows, len(GRADE_ORDER)) counts matrix, as column arrays.
+
+    Means and spreads are over graded (not absent) students; P25/P50/P75 are the grades
+    reached by that share of graded students, counting up from E.
+    """
+    counts = np.atleast_2d(np.asarray(counts, dtype=np.int64))
+    graded = counts[:, GRADED]
+    points = POINTS[GRADED]
+    sat = graded.sum(axis=1)
+    passed = counts[:, PASSED].sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = graded @ points / sat
+        variance = graded @ (points ** 2) / sat - mean ** 2
+        pass_rate = passed / sat * 100
+
+    stats = {
+        'Students': counts.sum(axis=1),
+        'Sat': sat,
+        'Absent': counts[:, ABSENT_INDEX],
+        'Passed': passed,
+        'Pass Rate %': np.round(pass_rate, 1),
+        'Mean GP': np.round(mean, 2),
+        'Std GP': np.round(np.sqrt(np.maximum(variance, 0)), 2)
+    }
+    graded_grades = np.array(GRADE_ORDER, dtype=object)[GRADED]
+    cumulative = graded.cumsum(axis=1)
+    for p in PERCENTILES:
+        # First grade whose cumulative count reaches p% of the graded students
+        index = np.minimum((cumulative < sat[:, None] * (p / 100)).sum(axis=1), len(graded_grades) - 1)
+        stats[f'P{p}'] = np.where(sat > 0, graded_grades[index], None)
+    return stats
+
+
+def cube_statistics(counts):
+    """row_statistics as a DataFrame with STAT_COLUMNS."""
+    return pd.DataFrame(row_statistics(counts), columns=STAT_COLUMNS)
+
+
+class GradeCube:
+    """Grade counts and derived statistics per (course, exam, subject). Thread-safe."""
+
+    def __init__(self):
+        # Dimension values of every row; _rows maps each row's identity to its number
+        self.keys = []
+        self.last_sheet_id = 0
+        self._counts = np.zeros((16, len(GRADE_ORDER)), dtype=np.int64)
+        self._stats = {column: np.empty(16, dtype=values.dtype)
+                       for column, values in row_statistics(self._counts[:1]).items()}
+        self._rows = {}
+        self._index = {dimension: {} for dimension in DIMENSIONS}
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def counts(self):
+        return self._counts[:len(self.keys)]
+
+    def _row(self, key, identity=None):
+        identity = key if identity is None else identity
+        row = self._rows.get(identity)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self._counts):
+                # Capacity doubles, so adding sheets one by one stays cheap
+                self._counts = np.vstack([self._counts, np.zeros_like(self._counts)])
+                self._stats = {column: np.concatenate([values, np.empty_like(values)])
+                               for column, values in self._stats.items()}
+            self.keys.append(key)
+            self._rows[identity] = row
+            for dimension, value in zip(DIMENSIONS, key):
+                self._index[dimension].setdefault(value, set()).add(row)
+        return row
+
+    def set_counts(self, keys, counts, identities=None):
+        """Set the grade counts of many (course, exam, subject) keys; new keys add rows.
+
+        identities, when given, tell rows apart instead of the keys (several rows may then
+        share dimension values).
+        """
+        counts = np.atleast_2d(np.asarray(counts, dtype=np.int64))
+        with self._lock:
+            rows = [self._row(key, identity) for key, identity in zip(keys, identities or [None] * len(keys))]
+            self._counts[rows] = counts
+            # Only the touched rows' statistics are recomputed
+            for column, values in row_statistics(self._counts[rows]).items():
+                self._stats[column][rows] = values
+
+    def refresh(self, store):
+        """Pick up sheets stored since the last refresh; returns the number of updated rows."""
+        with self._lock:
+            rows = store.grade_count_rows(self.last_sheet_id)
+            if not rows:
+                return 0
+            sheets = {}
+            for sheet_id, course, exam, subject, grade, count in rows:
+                key, counts = sheets.setdefault(sheet_id, ((course, exam, subject), np.zeros(len(GRADE_ORDER))))
+                if grade in GRADE_INDEX:
+                    counts[GRADE_INDEX[grade]] = count
+            # Later sheets of the same key (revised uploads) replace earlier ones; sheets
+            # without course/exam/subject are never revisions of each other, so keep a row each
+            latest = {}
+            for sheet_id, (key, counts) in sorted(sheets.items()):
+                identity = key if is_identified(dict(zip(DIMENSIONS, key))) else ('sheet', sheet_id)
+                latest[identity] = key, counts
+            self.set_counts([key for key, _ in latest.values()], np.array([counts for _, counts in latest.values()]),
+                            identities=list(latest))
+            self.last_sheet_id = max(sheets)
+            return len(latest)
+
+    def rows(self, course=None, exam=None, subject=None):
+        """Row numbers matching the given dimension values (None matches everything)."""
+        with self._lock:
+            selected = None
+            for dimension, value in zip(DIMENSIONS, (course, exam, subject)):
+                if value is None:
+                    continue
+                matches = self._index[dimension].get(value, set())
+                selected = matches if selected is None else selected & matches
+            return sorted(range(len(self.keys)) if selected is None else selected)
+
+    def values(self, dimension, **filters):
+        """Distinct values of a dimension within a slice, sorted."""
+        with self._lock:
+            position = DIMENSIONS.index(dimension)
+            return sorted({self.keys[row][position] for row in self.rows(**filters)})
+
+    def totals(self, **filters):
+        """Statistics of a whole slice, from its summed counts."""
+        with self._lock:
+            counts = self._counts[self.rows(**filters)].sum(axis=0)
+        return {column: values[0] for column, values in row_statistics(counts).items()}
+
+    def compare(self, by='subject', **filters):
+        """One row of statistics per value of a dimension (e.g. subject vs subject) within a slice."""
+        with self._lock:
+            rows = self.rows(**filters)
+            position = DIMENSIONS.index(by)
+            labels = [self.keys[row][position] for row in rows]
+            groups, inverse = np.unique(np.array(labels, dtype=object), return_inverse=True) \
+                if rows else (np.array([], dtype=object), np.array([], dtype=np.int64))
+            counts = np.zeros((len(groups), len(GRADE_ORDER)), dtype=np.int64)
+            np.add.at(counts, inverse, self._counts[rows])
+        comparison = cube_statistics(counts)
+        comparison.insert(0, by.title(), groups)
+        return comparison
+
+
+# Module-level cube over the results store, so it survives Streamlit reruns
+cohort_cube = GradeCube()
@@ -0,0 +1,264 @@
+"""
+Headless HTTP API for parsing mark sheets and generating reports.
+
+Usage:
+    python api.py --port 8000
+    uvicorn api:app --port 8000
+
+Endpoints:
+    POST /api/marksheets                     Upload a workbook (raw body or multipart field "file")
+    GET  /api/marksheets/{id}                Parsed sheets of an uploaded workbook
+    GET  /api/marksheets/{id}/distribution   Grade distribution JSON
+    GET  /api/marksheets/{id}/report.pdf     PDF report
+    GET  /api/marksheets/{id}/report.xlsx    Excel report
+    GET  /api/health
+    GET  /metrics                            Stage counters in Prometheus text format
+
+Report endpoints take an optional ?sheet=NAME; without it a single-sheet workbook is
+reported as is and a multi-subject workbook as all subjects combined.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from marksheet_cache import LRUCache, content_hash
+from metrics import stage_totals, start_run
+from shared_cache import shared_cache
+
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+STREAM_CHUNK_BYTES = 64 * 1024
+
+REPORT_TYPES = {
+    'pdf': 'application/pdf',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+# Uploaded workbooks by content hash; parsed results come from the app's workbook cache.
+# With a shared cache, an upload can be reported on by any API process behind a balancer.
+uploads = LRUCache(max_entries=64, shared=shared_cache, namespace='upload')
+# Finished reports by report_job_key, shared between API processes (the app's report jobs
+# keep their own 'report' entries, stored as raw bytes rather than pickled)
+reports = LRUCache(max_entries=32, shared=shared_cache, namespace='api_report')
+
+
+def render_report(df, metadata, distribution_df, breakdown_df, kind):
+    """Process pool worker: render one report. Returns (bytes, stage records) for the server's counters."""
+    from app import generate_pdf_report, generate_excel_report
+
+    run = start_run()
+    if kind == 'pdf':
+        data = generate_pdf_report(df, metadata, distribution_df, breakdown_df=breakdown_df).getvalue()
+    else:
+        data = generate_excel_report(df, distribution_df, breakdown_df).getvalue()
+    return data, run.records
+
+
+def error(message, status_code):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+
+def sheet_summary(upload_id, sheets, skipped):
+    return {
+        'id': upload_id,
+        'sheets': [
+            {'sheet': name, 'course': metadata['course'], 'exam': metadata['exam'],
+             'subject': metadata['subject'], 'students': len(df)}
+            for name, df, metadata in sheets
+        ],
+        'skipped': skipped
+    }
+
+
+async def read_upload(request):
+    """Return the uploaded workbook bytes from a multipart form or the raw request body."""
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        form = await request.form()
+        upload = form.get('file')
+        if upload is None or isinstance(upload, str):
+            raise ValueError("Multipart uploads need a 'file' field")
+        data = await upload.read()
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise OverflowError
+        return data
+
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise OverflowError
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+async def parse_upload(upload_id):
+    """Parse an uploaded workbook off the event loop. Returns (sheets, skipped) or None if unknown."""
+    from app import read_semester_workbook
+
+    data = uploads.get(upload_id)
+    if data is None:
+        return None
+    return await run_in_threadpool(read_semester_workbook, data)
+
+
+async def selected_view(request):
+    """Resolve the upload and ?sheet= of a request to (df, metadata, breakdown_df), or an error response."""
+    from app import report_view
+
+    parsed = await parse_upload(request.path_params['upload_id'])
+    if parsed is None:
+        return None, error("Unknown upload id", 404)
+    sheets, _ = parsed
+    try:
+        return report_view(sheets, request.query_params.get('sheet')), None
+    except KeyError:
+        return None, error(f"Unknown sheet: {request.query_params.get('sheet')}", 404)
+
+
+async def upload_marksheet(request):
+    from app import read_semester_workbook
+
+    try:
+        data = await read_upload(request)
+    except OverflowError:
+        return error(f"Upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB", 413)
+    except ValueError as e:
+        return error(str(e), 400)
+    if not data:
+        return error("Empty upload", 400)
+
+    try:
+        sheets, skipped = await run_in_threadpool(read_semester_workbook, data)
+    except Exception as e:
+        return error(f"Error parsing file: {str(e)}", 422)
+    if not sheets:
+        return error(f"Error parsing file: {next(iter(skipped.values()), 'No sheets found')}", 422)
+
+    upload_id = content_hash(data)
+    uploads.put(upload_id, data)
+    return JSONResponse(sheet_summary(upload_id, sheets, skipped), status_code=201)
+
+
+async def get_marksheet(request):
+    upload_id = request.path_params['upload_id']
+    parsed = await parse_upload(upload_id)
+    if parsed is None:
+        return error("Unknown upload id", 404)
+    return JSONResponse(sheet_summary(upload_id, *parsed))
+
+
+async def get_distribution(request):
+    from app import calculate_grade_distribution, grade_statistics
+
+    view, response = await selected_view(request)
+    if response is not None:
+        return response
+    df, metadata, _ = view
+    distribution_df = calculate_grade_distribution(df)
+    return JSONResponse({
+        'id': request.path_params['upload_id'],
+        'sheet': request.query_params.get('sheet'),
+        'course': metadata['course'],
+        'exam': metadata['exam'],
+        'subject': metadata['subject'],
+        'students': len(df),
+        'distribution': distribution_df.to_dict('records'),
+        'statistics': grade_statistics(distribution_df['Count'])
+    })
+
+
+async def get_report(request):
+    from app import calculate_grade_distribution, report_job_key
+
+    kind = request.path_params['kind']
+    if kind not in REPORT_TYPES:
+        return error(f"Unknown report type: {kind}", 404)
+    view, response = await selected_view(request)
+    if response is not None:
+        return response
+    df, metadata, breakdown_df = view
+
+    key = report_job_key(df, metadata, kind)
+    data = reports.get(key)
+    if data is None:
+        # Rendering is CPU-bound, so it runs in the process pool instead of the event loop
+        loop = asyncio.get_running_loop()
+        try:
+            data, records = await loop.run_in_executor(request.app.state.render_pool, render_report, df, metadata,
+                                                       calculate_grade_distribution(df), breakdown_df, kind)
+        except Exception as e:
+            return error(f"Error generating report: {type(e).__name__}: {e}", 500)
+        # Worker processes keep their own totals; fold their stages into this process's counters
+        for record in records:
+            stage_totals.add(record)
+        reports.put(key, data)
+
+    def chunks():
+        for start in range(0, len(data), STREAM_CHUNK_BYTES):
+            yield data[start:start + STREAM_CHUNK_BYTES]
+
+    return StreamingResponse(chunks(), media_type=REPORT_TYPES[kind], headers={
+        'Content-Disposition': f'attachment; filename="Semester_Report.{kind}"',
+        'Content-Length': str(len(data))
+    })
+
+
+async def health(request):
+    return JSONResponse({'status': 'ok', 'uploads': len(uploads)})
+
+
+async def prometheus_metrics(request):
+    return PlainTextResponse(stage_totals.prometheus(), media_type='text/plain; version=0.0.4')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Spawned workers do not inherit locks held by the server's threads
+    workers = int(os.getenv('EXAMTOOL_API_WORKERS', '0')) or None
+    app.state.render_pool = ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+    try:
+        yield
+    finally:
+        app.state.render_pool.shutdown(cancel_futures=True)
+
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health),
+        Route('/metrics', prometheus_metrics),
+        Route('/api/marksheets', upload_marksheet, methods=['POST']),
+        Route('/api/marksheets/{upload_id}', get_marksheet),
+        Route('/api/marksheets/{upload_id}/distribution', get_distribution),
+        Route('/api/marksheets/{upload_id}/report.{kind}', get_report),
+    ],
+    lifespan=lifespan
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the mark sheet HTTP API.")
+    parser.add_argument('--host', default='127.0.0.1', help="Bind address (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="Port (default: 8000)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Report rendering processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if args.workers is not None:
+        os.environ['EXAMTOOL_API_WORKERS'] = str(args.workers)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
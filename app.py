@@ -1,509 +1,1059 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 from io import BytesIO
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from datetime import datetime
 import os
-try:
-    from scipy.interpolate import make_interp_spline
-except ImportError:
-    make_interp_spline = None
-
-# Page configuration
-st.set_page_config(
-    page_title="Semester Report Generator",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# Initialize theme
-if 'dark_mode' not in st.session_state:
-    st.session_state.dark_mode = False
-
-# Theme colors
-if st.session_state.dark_mode:
-    theme_colors = {
-        "primary_bg": "#0f172a", "secondary_bg": "#1e293b", "card_bg": "#1e293b",
-        "accent": "#fbbf24", "accent_hover": "#f59e0b", "text_primary": "#f8fafc",
-        "text_secondary": "#94a3b8", "border": "#334155"
-    }
-else:
-    theme_colors = {
-        "primary_bg": "#f1f5f9", "secondary_bg": "#ffffff", "card_bg": "#ffffff",
-        "accent": "#b45309", "accent_hover": "#78350f", "text_primary": "#1e293b",
-        "text_secondary": "#64748b", "border": "#cbd5e1"
-    }
+from concurrent.futures import ThreadPoolExecutor
+from marksheet_cache import content_hash, fingerprint_cache, parse_cache, workbook_cache
+from marksheet_reader import MarksheetWorkbook, detect_format
+from marksheet_pdf import is_pdf, read_pdf_cells
+from charts import PDF_CHART_SIZE, chart_renderer, pdf_chart_backend, pdf_vector_chart
+from results_store import results_store
+from transcripts import build_transcripts, generate_transcript_excel, transcript_indexes
+from report_jobs import FAILED, report_jobs
+from metrics import activate, current_run, stage, start_run
+from report_styles import paragraph_styles, table_styles
+from theme import theme_css
+from revisions import UNKNOWN_METADATA, combined_fingerprint, results_fingerprint
+from layouts import PROBE_ROWS, metadata_from_cells, resolve_layout
+from analytics import PASS_GRADE, cohort_cube
+from results_view import CONTAINS, PAGE_SIZES, PREFIX, SORT_ORDERS, page_count, results_index
+from columnar import EXPORT_FORMATS, EXPORT_MIME_TYPES, detect_export, export_info, export_results, load_results
+from grades import GRADE_ORDER, as_grades, distribution_frame, grade_count_matrix, grade_counts, grade_statistics
 
-# CSS Styling
-st.markdown(f"""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Outfit:wght@400;500;600;700&display=swap');
-    
-    * {{ font-family: 'Inter', sans-serif; }}
-    
-    .stApp {{
-        background-color: {theme_colors['primary_bg']};
-    }}
-    
-    h1, h2, h3, h4 {{
-        font-family: 'Outfit', sans-serif;
-        color: {theme_colors['text_primary']} !important;
-    }}
-    
-    [data-testid="stMarkdownContainer"] h1,
-    [data-testid="stMarkdownContainer"] h2,
-    [data-testid="stMarkdownContainer"] h3,
-    [data-testid="stMarkdownContainer"] p,
-    label, span {{
-        color: {theme_colors['text_primary']} !important;
-    }}
-    
-    [data-testid="stVerticalBlockBorderWrapper"] {{
-        background-color: {theme_colors['card_bg']};
-        border: 1px solid {theme_colors['border']};
-        border-radius: 12px;
-        padding: 1.5rem;
-    }}
-    
-    [data-testid="stSidebar"] {{
-        background-color: {theme_colors['secondary_bg']};
-        border-right: 1px solid {theme_colors['border']};
-    }}
-    
-    .stButton > button {{
-        background-color: {theme_colors['accent']} !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 6px !important;
-        font-weight: 600 !important;
-        padding: 0.5rem 1.5rem !important;
-        transition: all 0.2s;
-    }}
-    
-    .stButton > button:hover {{
-        background-color: {theme_colors['accent_hover']} !important;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 12px rgba(180, 83, 9, 0.3);
-    }}
-    
-    div[data-testid="stMetricValue"] {{
-        font-size: 1.8rem !important;
-        font-weight: 700;
-        color: {theme_colors['accent']} !important;
-    }}
-    
-    div[data-testid="stMetricLabel"] {{
-        color: {theme_colors['text_secondary']} !important;
-        font-weight: 500;
-    }}
-    
-    .header-title {{
-        color: {theme_colors['accent']} !important;
-        font-size: 2rem !important;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-    }}
-    
-    .info-badge {{
-        background: linear-gradient(135deg, {theme_colors['accent']} 0%, {theme_colors['accent_hover']} 100%);
-        color: white;
-        padding: 0.5rem 1rem;
-        border-radius: 8px;
-        font-weight: 600;
-        display: inline-block;
-        margin: 0.25rem;
-    }}
-</style>
-""", unsafe_allow_html=True)
+def setup_page():
+    """Configure the Streamlit page and apply the theme CSS."""
+    # Page configuration
+    st.set_page_config(
+        page_title="Semester Report Generator",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    
+    # Initialize theme
+    if 'dark_mode' not in st.session_state:
+        st.session_state.dark_mode = False
+    
+    # CSS Styling (built once per theme in theme.py)
+    st.markdown(theme_css(st.session_state.dark_mode), unsafe_allow_html=True)
 
-def parse_semester_marksheet(file):
-    """Parse the semester mark sheet Excel file - extracts only valid student records."""
+# Bump when parsing logic changes so cached results from older parsers are not reused
+PARSER_VERSION = "3"
+
+METADATA_LABELS = ('course', 'exam', 'subject')
+
+def extract_metadata(df_raw):
+    """Find the Course/Exam/Subject values in the header block (first 15 rows)."""
+    metadata = dict(UNKNOWN_METADATA)
+    block = df_raw.iloc[:15]
+    if block.empty:
+        return metadata
+    
+    # One string match over every header cell; labels are cells starting with a metadata key
+    cells = pd.Series(block.to_numpy(dtype=object).ravel()).map(str).str.strip()
+    labels = cells.str.lower().str.extract(f"^({'|'.join(METADATA_LABELS)})", expand=False)
+    
+    # A value is the first non-empty cell to the right of its label (skipping ':' separators)
+    n_cols = block.shape[1]
+    valid = (block.notna().to_numpy().ravel() & ~cells.isin([':', '', 'nan']).to_numpy()).reshape(-1, n_cols)
+    text = cells.to_numpy().reshape(-1, n_cols)
+    
+    # Walk the (few) label hits in row-major order so later labels win, as before
+    for pos in np.flatnonzero(labels.notna().to_numpy()):
+        i, j = divmod(pos, n_cols)
+        following = valid[i, j + 1:]
+        if following.any():
+            metadata[labels.iat[pos]] = text[i, j + 1 + following.argmax()]
+    
+    return metadata
+
+def extract_students(student_columns, numbered=True):
+    """Extract valid student records from the (#, Registration Number, Grade) columns, column-wise.
+    
+    Sheets without a '#' column pass (Registration Number, Grade) with numbered=False;
+    rows holding both a registration number and a grade are numbered in sheet order.
+    """
+    reg_col = student_columns.iloc[:, -2]
+    grade_col = student_columns.iloc[:, -1]
+    
+    # Student number must be numeric; registration number must be present and non-empty
+    if numbered:
+        student_nums = pd.to_numeric(student_columns.iloc[:, 0], errors='coerce')
+        mask = np.isfinite(student_nums.to_numpy(dtype=float)) & reg_col.notna().to_numpy()
+    else:
+        mask = reg_col.notna().to_numpy() & grade_col.notna().to_numpy()
+    reg_nums = reg_col[mask].astype(str).str.strip()
+    valid_reg = ((reg_nums != '') & (reg_nums != 'nan')).to_numpy()
+    
+    rows = np.flatnonzero(mask)[valid_reg]
+    
+    # Missing grades (or literal 'nan') become N/A
+    grades = grade_col.iloc[rows]
+    grade_str = grades.astype(str).str.strip().where(grades.notna(), "N/A")
+    grade_str = grade_str.where(grade_str != 'nan', "N/A")
+    
+    numbers = student_nums.iloc[rows].astype('int64').astype(str).to_numpy() if numbered else \
+        np.arange(1, len(rows) + 1).astype(str)
+    return pd.DataFrame({
+        '#': numbers,
+        'Registration Number': reg_nums.to_numpy()[valid_reg],
+        'Grade': as_grades(grade_str.to_numpy())
+    })
+
+def read_file_bytes(file):
+    """Return the raw bytes of an uploaded file, file-like object, path or bytes."""
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            return f.read()
+    if hasattr(file, 'getvalue'):
+        return file.getvalue()
+    file.seek(0)
+    return file.read()
+
+def sheet_layout(header_block):
+    """Student table and metadata layout of a sheet from its first PROBE_ROWS rows (see layouts.py)."""
+    with stage('layout') as record:
+        layout, how = resolve_layout(header_block)
+        record.labels['layout'] = how
+    return layout
+
+def frame_layout_cells(df_raw):
+    """(header_block, student_columns, layout) of a sheet already decoded by pd.read_excel."""
+    layout = sheet_layout(df_raw.iloc[:PROBE_ROWS])
+    return df_raw.iloc[:PROBE_ROWS], df_raw.iloc[layout.start_row:, list(layout.columns)], layout
+
+def read_marksheet_sheet(data):
+    """Return (header_block, student_columns, layout) for the first sheet of a workbook's bytes.
+    
+    Known .xlsx/.xls signatures use the targeted streaming reader; anything else falls
+    back to decoding the whole sheet with pd.read_excel. Either way the sheet's layout
+    is resolved from its first rows. PDF mark sheets are read from their pages' tables
+    by marksheet_pdf and have no layout.
+    """
+    if is_pdf(data):
+        return (*read_pdf_cells(data), None)
+    if detect_format(data) is not None:
+        with MarksheetWorkbook(data) as workbook:
+            return workbook.read_layout_cells(0, sheet_layout, header_rows=PROBE_ROWS)
+    return frame_layout_cells(pd.read_excel(BytesIO(data), header=None))
+
+def read_sheet_cells(read, *args):
+    """Call a cell reader, explaining why a sheet has no student table it can read.
+    
+    Detected layouts always fit their sheet, so a sheet too narrow for its columns is
+    one where no table header was found and the fixed semester mark sheet layout does
+    not fit either (e.g. a grade distribution summary).
+    """
     try:
-        # Read the entire file without headers
-        df_raw = pd.read_excel(file, header=None)
+        return read(*args)
+    except IndexError as e:
+        raise ValueError(f"No '#' / 'Registration Number' / 'Grade' table header found in the first "
+                         f"{PROBE_ROWS} rows, and the sheet does not fit the semester mark sheet layout ({e})") from e
+
+def parse_sheet_cells(header_block, student_columns, layout=None):
+    """Turn one sheet's header block and student columns into (df_students, metadata).
+    
+    layout (from layouts.resolve_layout) locates the metadata cells and tells whether
+    the student columns start with a '#' column; None is the semester mark sheet layout.
+    """
+    # Metadata cells of a detected layout are read directly; otherwise search the first 15 rows
+    with stage('metadata'):
+        if layout is not None and layout.metadata_cells is not None:
+            metadata = metadata_from_cells(header_block, layout)
+        else:
+            metadata = extract_metadata(header_block)
+    
+    with stage('students') as record:
+        df_students = extract_students(student_columns, numbered=layout is None or layout.number_column is not None)
+        record.rows = len(df_students)
+    
+    # Final validation: ensure we have students
+    if len(df_students) == 0:
+        raise ValueError("No valid student records found in the file")
+    
+    return df_students, metadata
+
+def read_semester_marksheet(file):
+    """Parse the semester mark sheet Excel file, raising on invalid input.
+    
+    Returns (df_students, metadata). Used directly by headless callers that need the error.
+    """
+    with stage('parse') as record:
+        # Reruns on the same file content skip Excel decoding entirely
+        data = read_file_bytes(file)
+        if detect_export(data) is not None:
+            with stage('load_export'):
+                sheets, _ = load_results(data)
+            _, df_students, metadata = sheets[0]
+            metadata.pop('sheet', None)
+            record.rows = len(df_students)
+            return df_students, metadata
+        cache_key = content_hash(data, PARSER_VERSION)
+        cached = parse_cache.get(cache_key)
+        if cached is not None:
+            record.labels['cached'] = True
+            record.rows = len(cached[0])
+            return cached
         
-        # Dynamically extract metadata by searching the first 15 rows
-        course, exam, subject = "Unknown Course", "Unknown Exam", "Unknown Subject"
-        for i in range(min(15, len(df_raw))):
-            for j in range(df_raw.shape[1]):
-                val = str(df_raw.iloc[i, j]).strip().lower()
-                if val.startswith('course'):
-                    for k in range(j+1, df_raw.shape[1]):
-                        c_val = str(df_raw.iloc[i, k]).strip()
-                        if not pd.isna(df_raw.iloc[i, k]) and c_val not in [':', '', 'nan']:
-                            course = c_val
-                            break
-                elif val.startswith('exam'):
-                    for k in range(j+1, df_raw.shape[1]):
-                        c_val = str(df_raw.iloc[i, k]).strip()
-                        if not pd.isna(df_raw.iloc[i, k]) and c_val not in [':', '', 'nan']:
-                            exam = c_val
-                            break
-                elif val.startswith('subject'):
-                    for k in range(j+1, df_raw.shape[1]):
-                        c_val = str(df_raw.iloc[i, k]).strip()
-                        if not pd.isna(df_raw.iloc[i, k]) and c_val not in [':', '', 'nan']:
-                            subject = c_val
-                            break
+        # Only the header block and the student columns are read from the workbook
+        with stage('read_cells'):
+            cells = read_sheet_cells(read_marksheet_sheet, data)
+        df_students, metadata = parse_sheet_cells(*cells)
+        record.rows = len(df_students)
         
-        # Read student data starting from row 8 (0-indexed) to accommodate different formats
-        students = []
-        for i in range(8, len(df_raw)):
-            # Validate this is a student record row
-            student_num = df_raw.iloc[i, 0]
-            reg_num = df_raw.iloc[i, 1]
-            grade = df_raw.iloc[i, 13]
-            
-            # Skip empty rows instead of breaking, as formats can vary
-            if pd.isna(student_num) or pd.isna(reg_num):
-                continue
-            
-            # Validate student number is numeric (keep as string for display)
-            try:
-                # Verify it's a valid number but keep as string
-                int(float(student_num))
-                student_num_str = str(int(float(student_num)))
-            except (ValueError, TypeError):
-                # If not a valid number, skip this row
-                continue
-            
-            # Validate registration number is a string and not empty
-            reg_num_str = str(reg_num).strip()
-            if not reg_num_str or reg_num_str == 'nan':
-                continue
-            
-            # Get grade or set to N/A
-            grade_str = str(grade).strip() if not pd.isna(grade) else "N/A"
-            if grade_str == 'nan':
-                grade_str = "N/A"
-            
-            # Only add valid student records
-            students.append({
-                '#': student_num_str,
-                'Registration Number': reg_num_str,
-                'Grade': grade_str
-            })
+        parse_cache.put(cache_key, df_students, metadata)
+        return df_students, metadata
+
+# File types accepted by the uploaders: workbooks, PDF mark sheets and columnar exports
+MARKSHEET_UPLOAD_TYPES = ['xls', 'xlsx', 'pdf', 'parquet', 'arrow']
+
+# Sheet name reported for a PDF mark sheet, which has no sheets of its own
+PDF_SHEET_NAME = 'PDF'
+
+def read_semester_workbook(file, max_workers=None):
+    """Parse every sheet of a mark sheet workbook, one result per subject.
+    
+    The workbook is decoded once and its sheets are parsed concurrently on a thread pool.
+    Returns (sheets, skipped): sheets is a list of (sheet_name, df_students, metadata) in
+    workbook order for sheets with student records (metadata also carries 'sheet'), and
+    skipped maps every other sheet name to the reason it was not parsed.
+    """
+    with stage('parse', workbook=True) as record:
+        data = read_file_bytes(file)
+        if detect_export(data) is not None:
+            # Parquet/Arrow exports of an earlier parse load without any Excel decoding
+            with stage('load_export'):
+                sheets, skipped = load_results(data)
+            record.rows = sum(len(df) for _, df, _ in sheets)
+            return sheets, skipped
+        cache_key = content_hash(data, PARSER_VERSION + ':workbook')
+        cached = workbook_cache.get(cache_key)
+        if cached is not None:
+            record.labels['cached'] = True
+            record.rows = sum(len(df) for _, df, _ in cached[0])
+            return cached
+        
+        with stage('open_workbook'):
+            if is_pdf(data):
+                # A PDF holds one subject; its pages are extracted on marksheet_pdf's process pool
+                workbook, sheet_names = None, [PDF_SHEET_NAME]
+                
+                def read_cells(name):
+                    return (*read_pdf_cells(data), None)
+            elif detect_format(data) is None:
+                # Unknown formats: let pandas decode all sheets in one read
+                raw_sheets = pd.read_excel(BytesIO(data), header=None, sheet_name=None)
+                workbook, sheet_names = None, list(raw_sheets)
+                
+                def read_cells(name):
+                    return frame_layout_cells(raw_sheets[name])
+            else:
+                workbook = MarksheetWorkbook(data)
+                sheet_names = workbook.sheet_names
+                
+                def read_cells(name):
+                    return workbook.read_layout_cells(name, sheet_layout, header_rows=PROBE_ROWS)
         
-        df_students = pd.DataFrame(students)
+        # Pool threads do not inherit this context, so the run is passed in explicitly
+        run = current_run()
         
-        # Final validation: ensure we have students
-        if len(df_students) == 0:
-            raise ValueError("No valid student records found in the file")
+        def parse_sheet(name):
+            with activate(run):
+                try:
+                    with stage('read_cells', sheet=name):
+                        cells = read_sheet_cells(read_cells, name)
+                    return parse_sheet_cells(*cells), None
+                except Exception as e:
+                    return None, str(e)
         
-        metadata = {
-            'course': course,
-            'exam': exam,
-            'subject': subject
-        }
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                outcomes = list(executor.map(parse_sheet, sheet_names))
+        finally:
+            if workbook is not None:
+                workbook.close()
         
-        return df_students, metadata
+        sheets, skipped = [], {}
+        for name, (result, error) in zip(sheet_names, outcomes):
+            if result is None:
+                skipped[name] = error
+                continue
+            df_students, metadata = result
+            metadata['sheet'] = name
+            sheets.append((name, df_students, metadata))
+        record.rows = sum(len(df) for _, df, _ in sheets)
         
+        workbook_cache.put(cache_key, sheets, skipped)
+        return sheets, skipped
+
+def parse_semester_marksheet(file):
+    """Parse the semester mark sheet Excel file - extracts only valid student records."""
+    try:
+        return read_semester_marksheet(file)
+    except Exception as e:
+        st.error(f"Error parsing file: {str(e)}")
+        return None, None
+
+def parse_semester_workbook(file):
+    """Parse every sheet of the workbook; shows an error if no sheet has student records."""
+    try:
+        sheets, skipped = read_semester_workbook(file)
     except Exception as e:
         st.error(f"Error parsing file: {str(e)}")
         return None, None
+    if not sheets:
+        reason = next(iter(skipped.values()), "No sheets found")
+        st.error(f"Error parsing file: {reason}")
+        return None, None
+    return sheets, skipped
+
+def source_hash(file):
+    """Content hash of the mark sheet behind an upload; exports carry the hash of their source file."""
+    data = read_file_bytes(file)
+    if detect_export(data) is not None:
+        return export_info(data).get('source_hash') or content_hash(data)
+    return content_hash(data)
+
+def store_results(file, sheets, store=results_store):
+    """Save parsed sheets to the persistent results store; returns the number of new sheets.
+    
+    Keyed by the file's content hash, so saving a re-uploaded file (or its export) is a no-op.
+    """
+    file_hash = source_hash(file)
+    if store.contains(file_hash):
+        return 0
+    return store.ingest(file_hash, sheets)
+
+def combine_sheets(sheets):
+    """Combine per-subject results into one student table (with a Subject column) and metadata."""
+    df = pd.concat([df.assign(Subject=metadata['subject']) for _, df, metadata in sheets],
+                   ignore_index=True)
+    # Sheets with different extra grades concatenate to object; restore the grade dtype
+    df['Grade'] = as_grades(df['Grade'])
+    
+    def joined(key):
+        return ", ".join(dict.fromkeys(metadata[key] for _, _, metadata in sheets))
+    
+    metadata = {
+        'course': joined('course'),
+        'exam': joined('exam'),
+        'subject': f"All subjects ({len(sheets)})"
+    }
+    return df, metadata
+
+def report_view(sheets, sheet=None):
+    """Pick what to report on: one sheet by name, the only sheet, or all sheets combined.
+    
+    Returns (df, metadata, breakdown_df); breakdown_df is only set for the combined view.
+    Raises KeyError for an unknown sheet name.
+    """
+    if sheet is not None:
+        for name, df, metadata in sheets:
+            if name == sheet:
+                return df, metadata, None
+        raise KeyError(sheet)
+    if len(sheets) == 1:
+        _, df, metadata = sheets[0]
+        return df, metadata, None
+    df, metadata = combine_sheets(sheets)
+    return df, metadata, subject_breakdown(sheets)
+
+def subject_breakdown(sheets):
+    """One row per subject with its student count and the count of every grade."""
+    # All subjects are counted together as one subjects x grades matrix
+    counts = grade_count_matrix([df['Grade'] for _, df, _ in sheets])
+    breakdown_df = pd.DataFrame({
+        'Sheet': [name for name, _, _ in sheets],
+        'Subject': [metadata['subject'] for _, _, metadata in sheets],
+        'Students': [len(df) for _, df, _ in sheets]
+    })
+    return pd.concat([breakdown_df, pd.DataFrame(counts, columns=list(GRADE_ORDER))], axis=1)
 
 def calculate_grade_distribution(df):
     """Calculate grade distribution statistics."""
     if 'Grade' not in df.columns:
         return pd.DataFrame()
     
-    # Grade order - AB first, then worst to best
-    grade_order = ['AB', 'E', 'D', 'D+', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A', 'A+']
-    grade_counts = df['Grade'].value_counts()
-    
-    distribution = []
-    for grade in grade_order:
-        count = grade_counts.get(grade, 0)
-        # Include all grades, even those with 0 counts
-        distribution.append({
-            'Grade': grade,
-            'Count': count,
-            'Percentage': round((count / len(df)) * 100, 1) if len(df) > 0 else 0
-        })
-    
-    return pd.DataFrame(distribution)
-
-def create_grade_chart(distribution_df):
-    """Create grade distribution charts for web display (bar + pie)."""
-    if len(distribution_df) == 0:
-        return None
-    
-    # Filter out AB for the chart (but keep it in the table)
-    chart_data = distribution_df[~distribution_df['Grade'].isin(['AB'])]
-    
-    if len(chart_data) == 0:
-        return None
-    
-    grade_colors = {
-        'A+': '#10b981', 'A': '#059669', 'A-': '#047857',
-        'B+': '#3b82f6', 'B': '#2563eb', 'B-': '#1d4ed8',
-        'C+': '#f59e0b', 'C': '#d97706', 'C-': '#b45309',
-        'D+': '#ef4444', 'D': '#dc2626', 'E': '#991b1b', 'F': '#7f1d1d'
-    }
+    # One bincount over the grade codes; all grades are included, even those with 0 counts
+    with stage('distribution') as record:
+        record.rows = len(df)
+        return distribution_frame(grade_counts(df['Grade']), len(df))
+
+def create_grade_chart(distribution_df, fmt='png'):
+    """Create grade distribution charts for web display (bar + pie) as image bytes."""
+    with stage('chart', variant='web'):
+        return chart_renderer.render(distribution_df, variant='web', fmt=fmt)
+
+def create_grade_chart_pdf(distribution_df, fmt='png', backend=None):
+    """Create grade distribution bar chart only for PDF report.
     
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+    A ReportLab Drawing with the vector backend, image bytes with matplotlib.
+    """
+    backend = pdf_chart_backend(backend)
+    with stage('chart', variant='pdf', backend=backend):
+        if backend == 'vector':
+            return pdf_vector_chart(distribution_df)
+        return chart_renderer.render(distribution_df, variant='pdf', fmt=fmt)
+
+# Student rows per PDF page (18pt rows in the A4 frame, plus the header row); the first page also holds the heading
+STUDENT_ROWS_PER_PAGE = 40
+STUDENT_ROWS_FIRST_PAGE = 38
+
+class FlowableStream(list):
+    """List of flowables that refills itself from an iterator as ReportLab consumes it.
     
-    # Bar chart with smooth line overlay
-    colors_list = [grade_colors.get(g, '#6b7280') for g in chart_data['Grade']]
-    ax1.bar(chart_data['Grade'], chart_data['Count'], color=colors_list, alpha=0.7)
+    doc.build() only ever looks at the front of the list, so keeping a small buffer
+    lets the document be laid out without materialising every flowable first.
+    """
+    def __init__(self, flowables, lookahead=4):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
     
-    # Add smooth line chart overlay using interpolation
-    if len(chart_data) > 2:  # Need at least 3 points for smooth curve
-        x_pos = np.arange(len(chart_data))
-        y_vals = chart_data['Count'].values
-        
-        # Use simple plot for small number of points or if scipy is missing
-        if len(x_pos) > 2 and make_interp_spline is not None:
+    def __len__(self):
+        while super().__len__() < self._lookahead:
             try:
-                # Create a smooth B-spline
-                spline = make_interp_spline(x_pos, y_vals, k=3)  # Cubic spline
-                
-                x_smooth = np.linspace(x_pos.min(), x_pos.max(), 300)
-                y_smooth = spline(x_smooth)
-                
-                # Ensure line doesn't dip below 0
-                y_smooth = np.maximum(y_smooth, 0)
-                
-                ax1.plot(x_smooth, y_smooth, color='#b45309', linewidth=2, linestyle='-', zorder=3)
-            except Exception:
-                 # Fallback
-             ax1.plot(x_pos, y_vals, color='#b45309', linewidth=2, zorder=3)
-        else:
-             ax1.plot(x_pos, y_vals, color='#b45309', linewidth=2, zorder=3)
-    else:
-        # Fallback for single/two points
-        ax1.plot(chart_data['Grade'], chart_data['Count'], color='#b45309', marker='o', 
-                 linewidth=2, markersize=8, markerfacecolor='white', 
-                 markeredgewidth=2, markeredgecolor='#b45309', zorder=3)
-    
-    ax1.set_xlabel('Grade', fontsize=11, fontweight='bold')
-    ax1.set_ylabel('Count', fontsize=11, fontweight='bold')
-    ax1.set_title('Grade Distribution', fontsize=13, fontweight='bold')
-    ax1.grid(axis='y', alpha=0.3)
-    
-    # Pie chart
-    ax2.pie(chart_data['Count'], labels=chart_data['Grade'], autopct='%1.1f%%',
-            colors=colors_list, startangle=90, textprops={'fontsize': 10})
-    ax2.set_title('Grade Percentage', fontsize=13, fontweight='bold')
-    
-    plt.tight_layout()
-    return fig
-
-def create_grade_chart_pdf(distribution_df):
-    """Create grade distribution bar chart only for PDF report."""
-    if len(distribution_df) == 0:
-        return None
-    
-    # Filter out AB for the chart (but keep it in the table)
-    chart_data = distribution_df[~distribution_df['Grade'].isin(['AB'])]
-    
-    if len(chart_data) == 0:
-        return None
-    
-    grade_colors = {
-        'A+': '#10b981', 'A': '#059669', 'A-': '#047857',
-        'B+': '#3b82f6', 'B': '#2563eb', 'B-': '#1d4ed8',
-        'C+': '#f59e0b', 'C': '#d97706', 'C-': '#b45309',
-        'D+': '#ef4444', 'D': '#dc2626', 'E': '#991b1b', 'F': '#7f1d1d'
-    }
-    
-    # Single bar chart for PDF
-    fig, ax = plt.subplots(1, 1, figsize=(10, 5))
+                self.append(next(self._source))
+            except StopIteration:
+                break
+        return super().__len__()
+
+def student_table_rows(df):
+    """Build the student table body rows (#, Registration Number, Grade) with column-wise string ops."""
+    columns = [
+        df['#'].astype(str).str.slice(0, 5),
+        df['Registration Number'].astype(str).str.slice(0, 35),
+        df['Grade'].astype(str)
+    ]
+    return np.column_stack([col.to_numpy(dtype=object) for col in columns]).tolist() if len(df) else []
+
+def distribution_table_rows(distribution_df):
+    """Build the distribution table body rows (Grade, Count, Percentage%) column-wise."""
+    columns = [
+        distribution_df['Grade'].astype(str),
+        distribution_df['Count'].astype(str),
+        distribution_df['Percentage'].astype(str) + '%'
+    ]
+    return np.column_stack([col.to_numpy(dtype=object) for col in columns]).tolist() if len(distribution_df) else []
+
+# Grade groups shown per subject in the PDF breakdown table
+BREAKDOWN_GRADE_GROUPS = [
+    ('A', ['A+', 'A', 'A-']), ('B', ['B+', 'B', 'B-']), ('C', ['C+', 'C', 'C-']),
+    ('D/E', ['D+', 'D', 'E']), ('AB', ['AB'])
+]
+
+def breakdown_table_rows(breakdown_df):
+    """Build the subject breakdown rows (Subject, Students, grade group counts) column-wise."""
+    columns = [
+        breakdown_df['Subject'].astype(str).str.slice(0, 40),
+        breakdown_df['Students'].astype(str)
+    ]
+    for _, grades in BREAKDOWN_GRADE_GROUPS:
+        columns.append(breakdown_df.reindex(columns=grades, fill_value=0).sum(axis=1).astype(str))
+    return np.column_stack([col.to_numpy(dtype=object) for col in columns]).tolist() if len(breakdown_df) else []
+
+def student_table_chunks(df, rows_per_chunk=STUDENT_ROWS_PER_PAGE, first_chunk_rows=None):
+    """Yield page-sized student result Tables built from column arrays."""
+    from reportlab.platypus import Table
     
-    colors_list = [grade_colors.get(g, '#6b7280') for g in chart_data['Grade']]
-    ax.bar(chart_data['Grade'], chart_data['Count'], color=colors_list, width=0.6, alpha=0.7)
+    header = ['#', 'Registration Number', 'Grade']
+    student_style = table_styles()['students']
     
-    # Add smooth line chart overlay using interpolation
-    if len(chart_data) > 2:  # Need at least 3 points for smooth curve
-        x_pos = np.arange(len(chart_data))
-        y_vals = chart_data['Count'].values
+    # Rows are built per chunk, so only the chunk being laid out is held as Python lists
+    start, size = 0, first_chunk_rows or rows_per_chunk
+    while True:
+        end = min(start + size, len(df))
+        student_table = Table([header] + student_table_rows(df.iloc[start:end]), colWidths=[40, 350, 60],
+                              repeatRows=1)
+        student_table.setStyle(student_style)
+        yield student_table
         
-        # Use simple plot for small number of points or if scipy is missing
-        if len(x_pos) > 2 and make_interp_spline is not None:
-            try:
-                # Create a smooth B-spline
-                spline = make_interp_spline(x_pos, y_vals, k=3)
-                
-                x_smooth = np.linspace(x_pos.min(), x_pos.max(), 300)
-                y_smooth = spline(x_smooth)
-                
-                # Ensure line doesn't dip below 0
-                y_smooth = np.maximum(y_smooth, 0)
-                
-                ax.plot(x_smooth, y_smooth, color='#b45309', linewidth=2, linestyle='-', zorder=3)
-            except Exception:
-                # Fallback
-             ax.plot(x_pos, y_vals, color='#b45309', linewidth=2, zorder=3)
-        else:
-             ax.plot(x_pos, y_vals, color='#b45309', linewidth=2, zorder=3)
-    else:
-        # Fallback for single point
-        ax.plot(chart_data['Grade'], chart_data['Count'], color='#b45309', marker='o', 
-                linewidth=2, markersize=8, markerfacecolor='white', 
-                markeredgewidth=2, markeredgecolor='#b45309', zorder=3)
-    
-    ax.set_xlabel('Grade', fontsize=12, fontweight='bold')
-    ax.set_ylabel('Number of Students', fontsize=12, fontweight='bold')
-    ax.set_title('Grade Distribution', fontsize=14, fontweight='bold', pad=20)
-    ax.grid(axis='y', alpha=0.3, linestyle='--')
-    
-    # Add value labels on top of bars
-    for i, (grade, count) in enumerate(zip(chart_data['Grade'], chart_data['Count'])):
-        ax.text(i, count, str(count), ha='center', va='bottom', fontweight='bold', fontsize=10)
-    
-    plt.tight_layout()
-    return fig
-
-def generate_pdf_report(df, metadata, distribution_df):
-    """Generate PDF report."""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, 
-                           rightMargin=30, leftMargin=30, topMargin=40, bottomMargin=40)
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle('Title', parent=styles['Heading1'],
-        fontSize=24, textColor=colors.HexColor('#1e3a8a'), alignment=TA_CENTER, 
-        spaceAfter=5, fontName='Helvetica-Bold')
-    
-    report_type_style = ParagraphStyle('ReportType', parent=styles['Heading2'],
-        fontSize=16, textColor=colors.HexColor('#334155'), alignment=TA_CENTER, 
-        spaceAfter=10, fontName='Helvetica-Bold')
-    
-    subtitle_style = ParagraphStyle('Subtitle', parent=styles['Normal'],
-        fontSize=11, textColor=colors.HexColor('#64748b'), alignment=TA_CENTER, 
-        spaceAfter=20)
-    
-    elements.append(Paragraph("SAB Campus of CA Sri Lanka", title_style))
-    elements.append(Paragraph("Semester Mark Sheet Report", report_type_style))
-    elements.append(Paragraph(f"Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", subtitle_style))
-    elements.append(Spacer(1, 5))
+        if end >= len(df):
+            break
+        start, size = end, rows_per_chunk
+
+def report_title_flowables(report_type="Semester Mark Sheet Report"):
+    """Campus title, report type and generation date at the top of a report."""
+    from reportlab.platypus import Paragraph, Spacer
     
-    # Course Information - Each field on new line
-    info_style = ParagraphStyle('Info', parent=styles['Normal'], fontSize=10, leading=14)
-    info_data = [
+    styles = paragraph_styles()
+    return [
+        Paragraph("SAB Campus of CA Sri Lanka", styles['title']),
+        Paragraph(report_type, styles['report_type']),
+        Paragraph(f"Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['subtitle']),
+        Spacer(1, 5)
+    ]
+
+def report_info_rows(df, metadata):
+    """Course information rows of a report - each field on a new line."""
+    return [
         ['Course:', metadata['course']],
         ['Exam:', metadata['exam']],
         ['Subject:', metadata['subject']],
         ['Total Students:', str(len(df))]
     ]
+
+def report_summary_flowables(info_rows, distribution_df, chart, breakdown_df=None):
+    """Course information, grade distribution chart and table, and the optional subject breakdown.
     
-    info_table = Table(info_data, colWidths=[100, 430])
-    info_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#1e293b')),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ]))
+    chart is a vector Drawing or PNG bytes from create_grade_chart_pdf, or None.
+    """
+    from reportlab.platypus import Table, Paragraph, Spacer, Image
+    
+    styles = paragraph_styles()
+    tables = table_styles()
+    elements = []
+    
+    info_table = Table(info_rows, colWidths=[100, 430])
+    info_table.setStyle(tables['info'])
     elements.append(info_table)
     elements.append(Spacer(1, 8))
     
     # Grade Distribution
-    elements.append(Paragraph("<b>Grade Distribution Summary</b>", styles['Heading2']))
+    elements.append(Paragraph("<b>Grade Distribution Summary</b>", styles['heading']))
     elements.append(Spacer(1, 4))
     
     if len(distribution_df) > 0:
-        # Create chart (bar chart only for PDF)
-        fig = create_grade_chart_pdf(distribution_df)
-        if fig:
-            chart_buffer = BytesIO()
-            plt.savefig(chart_buffer, format='png', dpi=150, bbox_inches='tight')
-            plt.close(fig)
-            chart_buffer.seek(0)
-            
-            chart_img = Image(chart_buffer, width=460, height=255)
-            elements.append(chart_img)
+        # Chart (bar chart only for PDF)
+        if chart is not None:
+            if isinstance(chart, bytes):
+                chart = Image(BytesIO(chart), width=PDF_CHART_SIZE[0], height=PDF_CHART_SIZE[1])
+            elements.append(chart)
             elements.append(Spacer(1, 8))
         
         # Distribution table
-        dist_data = [['Grade', 'Count', 'Percentage']]
-        total_count = 0
-        
-        for _, row in distribution_df.iterrows():
-            dist_data.append([row['Grade'], str(row['Count']), f"{row['Percentage']}%"])
-            total_count += row['Count']
+        dist_data = [['Grade', 'Count', 'Percentage']] + distribution_table_rows(distribution_df)
+        total_count = distribution_df['Count'].sum()
         
         # Add totals row (percentage is always 100%)
         dist_data.append(['Total', str(total_count), "100%"])
         
         dist_table = Table(dist_data, colWidths=[70, 70, 80])
-        num_rows = len(dist_data)
-        dist_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e3a8a')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cbd5e1')),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f1f5f9')]),
-            ('TOPPADDING', (0, 0), (-1, -1), 2),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-            # Style for totals row
-            ('BACKGROUND', (0, num_rows - 1), (-1, num_rows - 1), colors.HexColor('#1e3a8a')),
-            ('TEXTCOLOR', (0, num_rows - 1), (-1, num_rows - 1), colors.white),
-            ('FONTNAME', (0, num_rows - 1), (-1, num_rows - 1), 'Helvetica-Bold'),
-        ]))
+        dist_table.setStyle(tables['distribution'])
         elements.append(dist_table)
         elements.append(Spacer(1, 10))
     
-    elements.append(PageBreak())
+    # Subject breakdown (combined multi-subject reports only)
+    if breakdown_df is not None and len(breakdown_df) > 0:
+        elements.append(Paragraph("<b>Subject Breakdown</b>", styles['heading']))
+        elements.append(Spacer(1, 4))
+        
+        breakdown_data = [['Subject', 'Students'] + [label for label, _ in BREAKDOWN_GRADE_GROUPS]]
+        breakdown_data += breakdown_table_rows(breakdown_df)
+        breakdown_table = Table(breakdown_data, colWidths=[230, 60] + [48] * len(BREAKDOWN_GRADE_GROUPS),
+                                repeatRows=1)
+        breakdown_table.setStyle(tables['breakdown'])
+        elements.append(breakdown_table)
+        elements.append(Spacer(1, 10))
+    
+    return elements
+
+def student_result_flowables(df, progress=None):
+    """Yield the Student Results heading and page-sized student tables.
+    
+    Tables are generated lazily so only a page's worth of rows is in memory at once.
+    progress, if given, is called with the fraction of df's rows laid out.
+    """
+    from reportlab.platypus import Paragraph, Spacer
+    
+    yield Paragraph("<b>Student Results</b>", paragraph_styles()['heading'])
+    yield Spacer(1, 10)
+    chunks = student_table_chunks(df, first_chunk_rows=STUDENT_ROWS_FIRST_PAGE)
+    for i, student_table in enumerate(chunks):
+        yield student_table
+        if progress and len(df):
+            progress(min(STUDENT_ROWS_FIRST_PAGE + i * STUDENT_ROWS_PER_PAGE, len(df)) / len(df))
+
+def report_footer():
+    """Page footer callback shared by every page of a report."""
+    from reportlab.lib import colors
+    
+    generated = f"Generated by {os.getenv('USERNAME', 'User')} on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+    footer_color = colors.HexColor('#64748b')
     
-    # Student Results
-    elements.append(Paragraph("<b>Student Results</b>", styles['Heading2']))
-    elements.append(Spacer(1, 10))
-    
-    student_data = [['#', 'Registration Number', 'Grade']]
-    for _, row in df.iterrows():
-        student_data.append([
-            str(row['#'])[:5],
-            str(row['Registration Number'])[:35],
-            str(row['Grade'])
-        ])
-    
-    student_table = Table(student_data, colWidths=[40, 350, 60])
-    student_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e3a8a')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),  # Align Registration Number column to left
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e1')),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')])
-    ]))
-    elements.append(student_table)
-    
-    # Footer
     def add_footer(canvas, doc):
         canvas.saveState()
         canvas.setFont('Helvetica', 8)
-        canvas.setFillColor(colors.HexColor('#64748b'))
-        canvas.drawString(40, 25, f"Generated by {os.getenv('USERNAME', 'User')} on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        canvas.setFillColor(footer_color)
+        canvas.drawString(40, 25, generated)
         canvas.setFont('Helvetica', 7)
         canvas.drawString(40, 15, "Dev@Salinda")
         canvas.restoreState()
     
-    doc.build(elements, onFirstPage=add_footer, onLaterPages=add_footer)
+    return add_footer
+
+def report_document(output):
+    """A4 document template with the report margins; returns (doc, buffer)."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+    
+    buffer = BytesIO() if output is None else output
+    doc = SimpleDocTemplate(buffer, pagesize=A4, 
+                           rightMargin=30, leftMargin=30, topMargin=40, bottomMargin=40)
+    return doc, buffer
+
+def generate_pdf_report(df, metadata, distribution_df, output=None, breakdown_df=None, progress=None,
+                        chart_backend=None):
+    """Generate PDF report.
+    
+    Student results are streamed to ReportLab in page-sized table chunks. Pass a file path
+    or writable file-like object as output to write there directly; otherwise the report
+    is returned in a BytesIO. For multi-subject workbooks, breakdown_df adds a per-subject
+    summary table. progress, if given, is called with the fraction of student rows laid out.
+    chart_backend is 'vector' or 'matplotlib' (default: EXAMTOOL_PDF_CHARTS, else 'vector').
+    """
+    # ReportLab is loaded on first use; styles are built once per process (report_styles.py)
+    from reportlab.platypus import PageBreak
+    
+    doc, buffer = report_document(output)
+    chart = create_grade_chart_pdf(distribution_df, backend=chart_backend) if len(distribution_df) > 0 else None
+    
+    elements = report_title_flowables()
+    elements += report_summary_flowables(report_info_rows(df, metadata), distribution_df, chart, breakdown_df)
+    elements.append(PageBreak())
+    
+    def report_flowables():
+        yield from elements
+        yield from student_result_flowables(df, progress)
+    
+    add_footer = report_footer()
+    with stage('pdf_build') as record:
+        record.rows = len(df)
+        doc.build(FlowableStream(report_flowables()), onFirstPage=add_footer, onLaterPages=add_footer)
+    if output is not None:
+        return output
     buffer.seek(0)
     return buffer
 
-# Main App
-def main():
+def create_grade_charts_pdf(distribution_dfs, max_workers=None, backend=None):
+    """PDF charts of many grade distributions; a Drawing, bytes or None per input.
+    
+    matplotlib charts are rendered concurrently; vector charts are cheap enough to draw inline.
+    """
+    backend = pdf_chart_backend(backend)
+    with stage('chart', variant='pdf', backend=backend, charts=len(distribution_dfs)):
+        if backend == 'vector':
+            return [pdf_vector_chart(distribution_df) for distribution_df in distribution_dfs]
+        return chart_renderer.render_many(distribution_dfs, variant='pdf', max_workers=max_workers)
+
+def section_anchor(key, title):
+    """Zero-size flowable marking where a report section starts.
+    
+    When drawn it adds a PDF bookmark and outline entry, and fills in the section's page
+    number form that the contents page already refers to (see page_number_ref).
+    """
+    from reportlab.platypus.flowables import CallerMacro
+    
+    def mark(flowable):
+        canvas = flowable.canv
+        canvas.bookmarkPage(key)
+        canvas.addOutlineEntry(title, key, level=0)
+        canvas.beginForm(f"page_{key}")
+        canvas.setFont('Helvetica', 11)
+        canvas.drawRightString(0, 2, str(canvas.getPageNumber()))
+        canvas.endForm()
+    
+    return CallerMacro(drawCallable=mark)
+
+def page_number_ref(key):
+    """Flowable showing a section's page number, which is only known once it is laid out.
+    
+    It draws a PDF form defined later by the section's anchor, so the contents page needs
+    no second layout pass. Right-aligned at the cell's right edge.
+    """
+    from reportlab.platypus.flowables import CallerMacro
+    
+    return CallerMacro(drawCallable=lambda flowable: flowable.canv.doForm(f"page_{key}"))
+
+def generate_consolidated_pdf_report(subjects, output=None, progress=None, max_workers=None,
+                                    chart_backend=None):
+    """Generate one PDF for many subjects with contents, a cohort summary and a section per subject.
+    
+    subjects is a list of (df, metadata, distribution_df) triples. Every chart (the
+    cohort's included) is rendered before layout starts. output, progress and
+    chart_backend work as in generate_pdf_report; progress covers the student rows of
+    all subjects.
+    
+    This is one file instead of N, not a faster way to build them: layout and chart
+    drawing dominate and are the same per subject, so it takes about as long as N
+    generate_pdf_report calls (styles are already cached per process).
+    """
+    from xml.sax.saxutils import escape
+    from reportlab.platypus import Table, Paragraph, PageBreak
+    
+    styles = paragraph_styles()
+    tables = table_styles()
+    doc, buffer = report_document(output)
+    
+    sheets = [(metadata.get('sheet') or metadata['subject'], df, metadata) for df, metadata, _ in subjects]
+    cohort_df, cohort_metadata = combine_sheets(sheets)
+    cohort_distribution = calculate_grade_distribution(cohort_df)
+    charts = create_grade_charts_pdf([cohort_distribution] + [dist for _, _, dist in subjects], max_workers,
+                                     chart_backend)
+    
+    # Contents: page numbers are filled in by each section's anchor during the build
+    sections = [('cohort', "Cohort Summary")] + [
+        (f"subject_{i}", metadata['subject']) for i, (_, metadata, _) in enumerate(subjects)
+    ]
+    contents_rows = [[Paragraph(f'<a href="#{key}">{escape(title)}</a>', styles['contents']), page_number_ref(key)]
+                     for key, title in sections]
+    contents_table = Table(contents_rows, colWidths=[470, 60], repeatRows=0)
+    contents_table.setStyle(tables['contents'])
+    
+    cohort_info = [
+        ['Course:', cohort_metadata['course']],
+        ['Exam:', cohort_metadata['exam']],
+        ['Subjects:', str(len(subjects))],
+        ['Total Students:', str(cohort_df['Registration Number'].nunique())],
+        ['Results:', str(len(cohort_df))]
+    ]
+    
+    total_rows = sum(len(df) for df, _, _ in subjects)
+    
+    def report_flowables():
+        yield from report_title_flowables("Consolidated Semester Report")
+        yield Paragraph("<b>Contents</b>", styles['heading'])
+        yield contents_table
+        yield PageBreak()
+        
+        yield section_anchor('cohort', "Cohort Summary")
+        yield Paragraph("Cohort Summary", styles['report_type'])
+        yield from report_summary_flowables(cohort_info, cohort_distribution, charts[0], subject_breakdown(sheets))
+        
+        rows_done = 0
+        for i, (df, metadata, distribution_df) in enumerate(subjects):
+            section_progress = None
+            if progress and total_rows:
+                section_progress = lambda fraction, done=rows_done, n=len(df): progress((done + fraction * n) / total_rows)
+            yield PageBreak()
+            yield section_anchor(f"subject_{i}", metadata['subject'])
+            yield Paragraph(escape(metadata['subject']), styles['report_type'])
+            yield from report_summary_flowables(report_info_rows(df, metadata), distribution_df, charts[i + 1])
+            yield PageBreak()
+            yield from student_result_flowables(df, section_progress)
+            rows_done += len(df)
+    
+    add_footer = report_footer()
+    with stage('pdf_build', consolidated=True) as record:
+        record.rows = total_rows
+        doc.build(FlowableStream(report_flowables()), onFirstPage=add_footer, onLaterPages=add_footer)
+    if output is not None:
+        return output
+    buffer.seek(0)
+    return buffer
+
+def generate_excel_report(df, distribution_df, breakdown_df=None):
+    """Generate Excel report with student results and grade distribution sheets.
+    
+    For multi-subject workbooks, pass breakdown_df to add a per-subject summary sheet.
+    """
+    excel_buffer = BytesIO()
+    with stage('excel_report') as record, pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
+        record.rows = len(df)
+        if breakdown_df is not None:
+            breakdown_df.to_excel(writer, sheet_name='Subject Breakdown', index=False)
+        df.to_excel(writer, sheet_name='Student Results', index=False)
+        distribution_df.to_excel(writer, sheet_name='Grade Distribution', index=False)
+    excel_buffer.seek(0)
+    return excel_buffer
+
+def build_pdf_report(df, metadata, distribution_df, breakdown_df=None, progress=None):
+    """Background job: the PDF report as bytes."""
+    return generate_pdf_report(df, metadata, distribution_df, breakdown_df=breakdown_df,
+                               progress=progress).getvalue()
+
+def build_consolidated_pdf_report(sheets, progress=None):
+    """Background job: the consolidated PDF of every subject sheet as bytes."""
+    subjects = [(df, metadata, calculate_grade_distribution(df)) for _, df, metadata in sheets]
+    return generate_consolidated_pdf_report(subjects, progress=progress).getvalue()
+
+def build_results_export(sheets, fmt, file_hash, progress=None):
+    """Background job: every parsed sheet as a Parquet or Arrow IPC export (bytes)."""
+    return export_results(sheets, fmt=fmt, parser_version=PARSER_VERSION, source_hash=file_hash).getvalue()
+
+def build_transcript_excel(index, progress=None):
+    """Background job: the transcripts workbook as bytes."""
+    return generate_transcript_excel(index).getvalue()
+
+def build_excel_report(df, distribution_df, breakdown_df=None, progress=None):
+    """Background job: the Excel report as bytes."""
+    return generate_excel_report(df, distribution_df, breakdown_df).getvalue()
+
+def sheet_fingerprints(file, sheets):
+    """results_fingerprint of every parsed sheet of an upload by sheet name, hashed once per file."""
+    key = content_hash(read_file_bytes(file), PARSER_VERSION)
+    fingerprints = fingerprint_cache.get(key)
+    if fingerprints is None:
+        with stage('fingerprint', rows=sum(len(df) for _, df, _ in sheets)):
+            fingerprints = {name: results_fingerprint(df) for name, df, _ in sheets}
+        fingerprint_cache.put(key, fingerprints)
+    return fingerprints
+
+def view_fingerprint(fingerprints, metadata):
+    """Fingerprint of the viewed results: the selected sheet's, or all sheets' for the combined view."""
+    sheet = metadata.get('sheet')
+    if sheet in fingerprints:
+        return fingerprints[sheet]
+    return combined_fingerprint(fingerprints.values())
+
+def report_job_key(df, metadata, kind, fingerprint=None):
+    """Identify a report by parsed results, parser version, selected view and report type.
+    
+    Keyed by the results rather than the file bytes, so re-uploading a revised workbook
+    only regenerates reports of the subjects whose results changed. Pass the results'
+    fingerprint when it is already known; otherwise the whole table is hashed.
+    """
+    fingerprint = results_fingerprint(df) if fingerprint is None else fingerprint
+    return (fingerprint, PARSER_VERSION, metadata['course'], metadata['exam'], metadata['subject'],
+            metadata.get('sheet'), kind)
+
+@st.fragment(run_every=1)
+def poll_report_job(job_id):
+    """Show a running job's progress; rerun the page once it has finished."""
+    job = report_jobs.get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    st.progress(job.progress, text=f"⏳ {job.status.title()}... {job.progress:.0%}")
+
+def show_report_job(job, label, file_name, mime):
+    """Render a report job: progress while running, then its download button."""
+    if job is None:
+        return
+    if job.status == FAILED:
+        st.error(f"Error generating report: {job.error}")
+    elif job.done:
+        st.download_button(label=label, data=job.result, file_name=file_name, mime=mime, width='stretch')
+    else:
+        poll_report_job(job.id)
+
+def select_subject_view(sheets, skipped):
+    """Show the per-subject breakdown for multi-sheet workbooks and return the selected view.
+    
+    Returns (df, metadata, breakdown_df); breakdown_df is only set for the combined view.
+    """
+    if len(sheets) == 1:
+        _, df, metadata = sheets[0]
+        return df, metadata, None
+    
+    breakdown_df = subject_breakdown(sheets)
+    with st.container(border=True):
+        st.markdown("### 📚 Subjects")
+        st.dataframe(breakdown_df, hide_index=True, width='stretch')
+        if skipped:
+            st.caption(f"Skipped sheets without student records: {', '.join(skipped)}")
+        labels = ["All subjects (combined)"] + [f"{metadata['subject']} ({name})" for name, _, metadata in sheets]
+        choice = st.selectbox("Show", range(len(labels)), format_func=lambda i: labels[i])
+    
+    if choice == 0:
+        df, metadata = combine_sheets(sheets)
+        return df, metadata, breakdown_df
+    _, df, metadata = sheets[choice - 1]
+    return df, metadata, None
+
+def show_student_results(df, metadata, fingerprint=None):
+    """Student Results table: filtered and sorted on the server, one page sent to the browser.
+    
+    The index is keyed by the results' fingerprint (see sheet_fingerprints), so filter,
+    sort and page changes do not rehash the table.
+    """
+    key = report_job_key(df, metadata, 'view', fingerprint)
+    with stage('results_index', rows=len(df)):
+        index = results_index(df, key)
+    
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 2])
+    with col1:
+        grades = st.multiselect("Grade", index.grades, key='results_grades', placeholder="All grades")
+    with col2:
+        search = st.text_input("Registration Number", key='results_search', placeholder="e.g. 2021/ICT")
+    with col3:
+        mode = st.selectbox("Match", [PREFIX, CONTAINS], key='results_match',
+                            format_func=lambda m: "Starts with" if m == PREFIX else "Contains")
+    with col4:
+        sort = st.selectbox("Sort by", list(SORT_ORDERS), format_func=SORT_ORDERS.get, key='results_sort')
+    
+    rows = index.rows(grades, search, mode, sort)
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key='results_page_size')
+    pages = page_count(len(rows), page_size)
+    # Changing the table or a filter starts again from the first page
+    view = (key, tuple(grades), search, mode, sort, page_size)
+    if st.session_state.get('results_view') != view:
+        st.session_state['results_view'] = view
+        st.session_state['results_page'] = 1
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key='results_page')
+    
+    start = (page - 1) * page_size
+    st.dataframe(index.page(rows, page, page_size), hide_index=True, width='stretch')
+    if len(rows) == 0:
+        st.caption(f"No students match (of {len(index)})")
+    else:
+        filtered = f" (filtered from {len(index)})" if len(rows) < len(index) else ""
+        st.caption(f"Showing {start + 1}-{min(start + page_size, len(rows))} of {len(rows)} students{filtered}")
+
+def show_revisions(revisions):
+    """Change summary of re-uploaded sheets against the upload they replaced."""
+    if not revisions:
+        return
+    with st.container(border=True):
+        st.markdown("### 🔁 Changes Since Last Upload")
+        for revision in revisions:
+            course, exam, subject = revision.key
+            summary = revision.summary()
+            st.markdown(f"**{subject}** ({exam}) - previous upload {revision.previous_uploaded}")
+            if not any(summary.values()):
+                st.caption("No student results changed; existing reports are reused")
+                continue
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Grades Changed", summary['changed'])
+            col2.metric("Students Added", summary['added'])
+            col3.metric("Students Removed", summary['removed'])
+            st.dataframe(revision.changes, hide_index=True, width='stretch')
+            if revision.counts_changed():
+                st.dataframe(revision.distribution_delta(), hide_index=True, width='stretch')
+            else:
+                st.caption("Grade counts are unchanged, so the distribution and charts are reused")
+
+def show_results_history(store=results_store):
+    """Query saved results: a student's history or a subject's distribution across exams."""
+    try:
+        subjects = store.subjects()
+    except Exception:
+        # History is optional; an unwritable database location just hides it
+        return
+    if not subjects:
+        return
+    
+    with st.container(border=True):
+        st.markdown("### 🗂️ Results History")
+        student_tab, subject_tab, changes_tab = st.tabs(["👤 Student", "📖 Subject", "🔁 Changes"])
+        with student_tab:
+            registration_number = st.text_input("Registration Number", placeholder="e.g. 2021/ICT/001")
+            if registration_number.strip():
+                history_df = store.student_history(registration_number)
+                if len(history_df) > 0:
+                    st.dataframe(history_df, hide_index=True, width='stretch')
+                else:
+                    st.info("No saved results for this registration number")
+        with subject_tab:
+            subject = st.selectbox("Subject", subjects)
+            st.dataframe(store.subject_distribution(subject), width='stretch')
+        with changes_tab:
+            change_log = store.change_log()
+            if len(change_log) > 0:
+                st.dataframe(change_log, hide_index=True, width='stretch')
+            else:
+                st.info("No grade changes between uploads yet")
+
+def show_analytics(store=results_store):
+    """Cross-subject dashboard sliced from the precomputed cohort cube."""
+    try:
+        with stage('analytics_refresh'):
+            cohort_cube.refresh(store)
+    except Exception:
+        # Like the history panel, analytics need a readable results store
+        return
+    if len(cohort_cube) == 0:
+        return
+    
+    with st.container(border=True):
+        st.markdown("### 🧮 Cohort Analytics")
+        col1, col2 = st.columns(2)
+        with col1:
+            course = st.selectbox("Course", ["All"] + cohort_cube.values('course'), key='analytics_course')
+        filters = {} if course == "All" else {'course': course}
+        with col2:
+            exam = st.selectbox("Exam", ["All"] + cohort_cube.values('exam', **filters), key='analytics_exam')
+        if exam != "All":
+            filters['exam'] = exam
+        
+        totals = cohort_cube.totals(**filters)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Results", int(totals['Students']))
+        col2.metric("Pass Rate", f"{totals['Pass Rate %']:.1f}%" if totals['Sat'] else "-")
+        col3.metric("Mean GP", f"{totals['Mean GP']:.2f}" if totals['Sat'] else "-")
+        col4.metric("Median Grade", totals['P50'] or "-")
+        
+        comparison = cohort_cube.compare('subject', **filters)
+        st.dataframe(comparison, hide_index=True, width='stretch')
+        st.bar_chart(comparison.set_index('Subject')['Mean GP'])
+        st.caption(f"Saved results only (latest upload of each sheet); passing grade is {PASS_GRADE} or above")
+
+def show_transcripts():
+    """Build student transcripts and GPA summaries across several uploaded mark sheets."""
+    with st.container(border=True):
+        st.markdown("### 🎓 Student Transcripts")
+        files = st.file_uploader("Drop several mark sheets to combine", type=MARKSHEET_UPLOAD_TYPES,
+                                 accept_multiple_files=True, key='transcript_files',
+                                 help="Every subject sheet in these files is combined per registration number")
+        if not files:
+            return
+        
+        sheets = []
+        for file in files:
+            try:
+                file_sheets, _ = read_semester_workbook(file)
+                sheets.extend(file_sheets)
+            except Exception as e:
+                st.warning(f"Skipped {file.name}: {str(e)}")
+        if not sheets:
+            return
+        
+        # Keyed by the uploads' contents: reruns reuse the index, and the workbook is a report job
+        key = (tuple(content_hash(read_file_bytes(file)) for file in files), PARSER_VERSION, 'transcripts')
+        index = transcript_indexes.get(key)
+        if index is None:
+            with stage('transcripts', rows=sum(len(df) for _, df, _ in sheets)):
+                index = build_transcripts(sheets)
+            transcript_indexes.put(key, index)
+        st.caption(f"{len(index)} students across {len(index.subjects)} subject(s)")
+        st.dataframe(index.summary(), hide_index=True, width='stretch')
+        
+        registration_number = st.selectbox("Transcript for", sorted(index.students),
+                                           key='transcript_student')
+        if registration_number:
+            st.dataframe(index.transcript(registration_number), hide_index=True, width='stretch')
+        
+        excel_key = key + ('xlsx',)
+        if st.button("📥 Download Transcripts (Excel)", width='stretch'):
+            report_jobs.submit(excel_key, build_transcript_excel, index)
+        show_report_job(
+            report_jobs.find(excel_key),
+            label="⬇️ Download Transcripts",
+            file_name=f"Transcripts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+def show_performance(run):
+    """Sidebar expander with the stage timings of this rerun."""
+    with st.sidebar.expander("⏱️ Performance"):
+        st.checkbox("Track peak memory (slower)", key='track_memory',
+                    help="Measure each stage's peak memory with tracemalloc from the next run")
+        rows = run.as_rows()
+        if not rows:
+            st.caption("No stages ran in this run")
+            return
+        perf_df = pd.DataFrame(rows)
+        perf_df.insert(1, 'ms', (perf_df.pop('seconds') * 1000).round(1))
+        perf_df['rows'] = perf_df['rows'].astype('Int64')
+        peak_bytes = perf_df.pop('peak_bytes')
+        if peak_bytes.notna().any():
+            perf_df.insert(2, 'peak KB', (peak_bytes / 1024).round(1))
+        st.dataframe(perf_df, hide_index=True, width='stretch')
+
+def show_app(run):
+    """Render the page; its stages are recorded into run."""
     # Sidebar
     with st.sidebar:
         st.markdown("### ⚙️ Settings")
         st.session_state.dark_mode = st.toggle("🌙 Dark Mode", value=st.session_state.dark_mode)
+        save_history = st.toggle("💾 Save Results to History", value=True,
+                                 help="Keep parsed results for student and subject history queries")
         st.markdown("---")
         st.markdown("### 📖 About")
         st.info("Upload semester mark sheets and generate comprehensive reports with grade distributions and analytics.")
@@ -516,14 +1066,29 @@ def main():
     # File Upload
     with st.container(border=True):
         st.markdown("### 📁 Upload Mark Sheet")
-        uploaded_file = st.file_uploader("Drop your Excel file here", type=['xls', 'xlsx'], 
-                                        help="Upload the semester mark sheet Excel file")
+        uploaded_file = st.file_uploader("Drop your Excel or PDF file here", type=MARKSHEET_UPLOAD_TYPES, 
+                                        help="Upload the semester mark sheet Excel file, its PDF export or a Parquet/Arrow results export")
     
     if uploaded_file:
-        # Parse the file
-        df, metadata = parse_semester_marksheet(uploaded_file)
+        # Parse every sheet of the workbook (one result per subject)
+        sheets, skipped = parse_semester_workbook(uploaded_file)
+        df, metadata, breakdown_df = None, None, None
+        if sheets:
+            if save_history:
+                try:
+                    added = store_results(uploaded_file, sheets)
+                    if added:
+                        st.toast(f"Saved {added} sheet(s) to results history")
+                    show_revisions(results_store.revisions(source_hash(uploaded_file)))
+                except Exception as e:
+                    st.warning(f"Could not save results to history: {str(e)}")
+            df, metadata, breakdown_df = select_subject_view(sheets, skipped)
         
         if df is not None and metadata is not None:
+            # Tables are hashed once per upload; every report and view key reuses the hashes
+            fingerprints = sheet_fingerprints(uploaded_file, sheets)
+            fingerprint = view_fingerprint(fingerprints, metadata)
+            
             # Display metadata
             with st.container(border=True):
                 st.markdown("### 📋 Course Information")
@@ -541,19 +1106,19 @@ def main():
             with st.container(border=True):
                 st.markdown("### 📊 Statistics")
                 col1, col2, col3, col4 = st.columns(4)
+                grade_stats = grade_statistics(distribution_df['Count']) if len(distribution_df) > 0 else None
                 
                 with col1:
                     st.metric("Total Students", len(df))
                 with col2:
-                    a_grades = len(df[df['Grade'].str.contains('A', na=False)])
-                    st.metric("A Grades", a_grades)
+                    if grade_stats:
+                        st.metric("A Grades", grade_stats['A'])
                 with col3:
-                    b_grades = len(df[df['Grade'].str.contains('B', na=False)])
-                    st.metric("B Grades", b_grades)
+                    if grade_stats:
+                        st.metric("B Grades", grade_stats['B'])
                 with col4:
-                    if len(distribution_df) > 0:
-                        top_grade = distribution_df.iloc[0]['Grade']
-                        st.metric("Most Common", top_grade)
+                    if grade_stats and grade_stats['most_common']:
+                        st.metric("Most Common", grade_stats['most_common'])
             
             # Grade Distribution
             if len(distribution_df) > 0:
@@ -562,9 +1127,9 @@ def main():
                     
                     col1, col2 = st.columns([3, 2])
                     with col1:
-                        fig = create_grade_chart(distribution_df)
-                        if fig:
-                            st.pyplot(fig)
+                        chart_png = create_grade_chart(distribution_df)
+                        if chart_png:
+                            st.image(chart_png, width='stretch')
                     
                     with col2:
                         st.dataframe(distribution_df, hide_index=True, width='stretch')
@@ -572,42 +1137,87 @@ def main():
             # Student Data
             with st.container(border=True):
                 st.markdown("### 👥 Student Results")
-                st.dataframe(df, hide_index=True, width='stretch')
+                show_student_results(df, metadata, fingerprint)
             
             # Generate Reports
+            # Reports are generated as background jobs; reruns show the job instead of regenerating
             with st.container(border=True):
                 st.markdown("### 📄 Generate Reports")
                 col1, col2 = st.columns(2)
+                pdf_key = report_job_key(df, metadata, 'pdf', fingerprint)
+                excel_key = report_job_key(df, metadata, 'xlsx', fingerprint)
                 
                 with col1:
                     if st.button("📥 Download PDF Report", width='stretch'):
-                        pdf_buffer = generate_pdf_report(df, metadata, distribution_df)
-                        st.download_button(
-                            label="⬇️ Download PDF",
-                            data=pdf_buffer,
-                            file_name=f"Semester_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                            mime="application/pdf",
-                            width='stretch'
-                        )
+                        report_jobs.submit(pdf_key, build_pdf_report, df, metadata, distribution_df,
+                                           breakdown_df=breakdown_df)
+                    show_report_job(
+                        report_jobs.find(pdf_key),
+                        label="⬇️ Download PDF",
+                        file_name=f"Semester_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                        mime="application/pdf"
+                    )
                 
                 with col2:
                     if st.button("📥 Download Excel Report", width='stretch'):
-                        excel_buffer = BytesIO()
-                        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                            df.to_excel(writer, sheet_name='Student Results', index=False)
-                            distribution_df.to_excel(writer, sheet_name='Grade Distribution', index=False)
-                        excel_buffer.seek(0)
-                        
-                        st.download_button(
-                            label="⬇️ Download Excel",
-                            data=excel_buffer,
-                            file_name=f"Semester_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            width='stretch'
-                        )
+                        report_jobs.submit(excel_key, build_excel_report, df, distribution_df,
+                                           breakdown_df=breakdown_df)
+                    show_report_job(
+                        report_jobs.find(excel_key),
+                        label="⬇️ Download Excel",
+                        file_name=f"Semester_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+                
+                # One document with contents, a cohort summary and a section per subject
+                if len(sheets) > 1:
+                    consolidated_key = (tuple(fingerprints.values()),
+                                        PARSER_VERSION, 'consolidated', 'pdf')
+                    if st.button("📚 Download Consolidated PDF (all subjects)", width='stretch'):
+                        report_jobs.submit(consolidated_key, build_consolidated_pdf_report, sheets)
+                    show_report_job(
+                        report_jobs.find(consolidated_key),
+                        label="⬇️ Download Consolidated PDF",
+                        file_name=f"Consolidated_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                        mime="application/pdf"
+                    )
+                
+                # Columnar export of every sheet; uploading it again skips Excel parsing
+                col1, col2 = st.columns([1, 2])
+                with col1:
+                    export_format = st.selectbox("Export format", list(EXPORT_FORMATS), key='export_format',
+                                                 format_func=lambda fmt: "Parquet" if fmt == 'parquet' else "Arrow IPC",
+                                                 label_visibility='collapsed')
+                export_key = (tuple(fingerprints.values()),
+                              PARSER_VERSION, 'export', export_format)
+                with col2:
+                    if st.button("📥 Export Results (Parquet/Arrow)", width='stretch'):
+                        report_jobs.submit(export_key, build_results_export, sheets, export_format,
+                                           source_hash(uploaded_file))
+                    show_report_job(
+                        report_jobs.find(export_key),
+                        label=f"⬇️ Download {EXPORT_FORMATS[export_format]}",
+                        file_name=f"Semester_Results_{datetime.now().strftime('%Y%m%d_%H%M%S')}{EXPORT_FORMATS[export_format]}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
     else:
         # Show welcome message
         st.info("👆 Please upload a semester mark sheet Excel file to get started")
+    
+    show_results_history()
+    show_analytics()
+    show_transcripts()
+    show_performance(run)
+
+# Main App
+def main():
+    setup_page()
+    run = start_run(track_memory=st.session_state.get('track_memory', False))
+    try:
+        show_app(run)
+    finally:
+        # Memory tracing slows every session, so it stops when no run asks for it
+        run.finish()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,250 @@
+"""
+Headless batch mode: generate PDF and Excel reports for many mark sheets in parallel.
+
+Usage:
+    python batch.py "marksheets/" -o reports/ --workers 4
+    python batch.py "exports/*WE*.xlsx" -o reports/
+    python batch.py "archive/" --no-pdf --no-excel --store results.db
+    python batch.py "marksheets/" -o reports/ --consolidated
+    python batch.py "marksheets/" -o exports/ --no-pdf --no-excel --export parquet
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+MARKSHEET_EXTENSIONS = ('.xls', '.xlsx', '.pdf', '.parquet', '.arrow')
+
+
+def find_marksheets(inputs, exclude_dir=None):
+    """Expand directories and glob patterns into a sorted list of mark sheet paths."""
+    exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            candidates = glob.glob(item, recursive=True)
+        for path in candidates:
+            if not os.path.isfile(path) or not path.lower().endswith(MARKSHEET_EXTENSIONS):
+                continue
+            # Skip Excel lock files and anything we wrote ourselves
+            if os.path.basename(path).startswith('~$'):
+                continue
+            if exclude_dir and os.path.dirname(os.path.abspath(path)) == exclude_dir:
+                continue
+            found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def output_names(paths):
+    """Map each input path to a unique output base name (without extension)."""
+    names = {}
+    used = set()
+    for path in paths:
+        stem, ext = os.path.splitext(os.path.basename(path))
+        name = stem
+        if name in used:
+            name = f"{stem}_{ext.lstrip('.')}"
+        counter = 2
+        while name in used:
+            name = f"{stem}_{counter}"
+            counter += 1
+        used.add(name)
+        names[path] = name
+    return names
+
+
+def process_marksheet(path, output_dir, name, write_pdf=True, write_excel=True, store_path=None,
+                      consolidated=False, export_format=None, chart_backend=None):
+    """Parse one mark sheet and write its reports. Never raises; errors are returned.
+    
+    When store_path is given, the parsed sheets are also saved to that results store.
+    With consolidated, multi-subject workbooks get a consolidated PDF (contents, cohort
+    summary and one section per subject) instead of the combined PDF. export_format
+    ('parquet' or 'arrow') also writes the parsed sheets as a columnar export, which
+    later runs can take as input instead of the Excel file. chart_backend ('vector' or
+    'matplotlib') selects how PDF charts are drawn.
+    """
+    start = time.perf_counter()
+    result = {'file': path, 'students': 0, 'outputs': [], 'error': None}
+    try:
+        # Imported here so worker processes load the heavy libraries once each
+        from app import read_semester_workbook, calculate_grade_distribution, report_view, \
+            generate_pdf_report, generate_consolidated_pdf_report, generate_excel_report, store_results, \
+            source_hash, PARSER_VERSION
+        from columnar import EXPORT_FORMATS, export_results
+        from results_store import ResultsStore
+        from metrics import start_run
+        run = start_run()
+
+        sheets, skipped = read_semester_workbook(path)
+        if not sheets:
+            raise ValueError(next(iter(skipped.values()), "No sheets found"))
+
+        # Multi-subject workbooks get one combined report with a per-subject breakdown
+        df, metadata, breakdown_df = report_view(sheets)
+        distribution_df = calculate_grade_distribution(df)
+        result['students'] = len(df)
+        result['subject'] = metadata['subject']
+        result['skipped_sheets'] = list(skipped)
+
+        if store_path:
+            result['stored_sheets'] = store_results(path, sheets, ResultsStore(store_path))
+
+        if write_pdf:
+            pdf_path = os.path.join(output_dir, f"{name}.pdf")
+            if consolidated and len(sheets) > 1:
+                subjects = [(sheet_df, sheet_metadata, calculate_grade_distribution(sheet_df))
+                            for _, sheet_df, sheet_metadata in sheets]
+                generate_consolidated_pdf_report(subjects, output=pdf_path, chart_backend=chart_backend)
+            else:
+                generate_pdf_report(df, metadata, distribution_df, output=pdf_path, breakdown_df=breakdown_df,
+                                    chart_backend=chart_backend)
+            result['outputs'].append(pdf_path)
+
+        if write_excel:
+            excel_path = os.path.join(output_dir, f"{name}.xlsx")
+            with open(excel_path, 'wb') as f:
+                f.write(generate_excel_report(df, distribution_df, breakdown_df).getvalue())
+            result['outputs'].append(excel_path)
+
+        if export_format:
+            export_path = os.path.join(output_dir, f"{name}{EXPORT_FORMATS[export_format]}")
+            export_results(sheets, output=export_path, fmt=export_format, parser_version=PARSER_VERSION,
+                           source_hash=source_hash(path))
+            result['outputs'].append(export_path)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    else:
+        # Seconds per stage name, to spot which stage makes an outlier file slow
+        result['stages'] = {}
+        for row in run.as_rows():
+            result['stages'][row['stage']] = result['stages'].get(row['stage'], 0.0) + row['seconds']
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_batch(paths, output_dir, workers=None, write_pdf=True, write_excel=True, progress=None,
+              store_path=None, consolidated=False, export_format=None, chart_backend=None):
+    """Process mark sheets on a process pool and return the per-file results in input order."""
+    os.makedirs(output_dir, exist_ok=True)
+    names = output_names(paths)
+    results = {}
+
+    if workers == 1:
+        for path in paths:
+            results[path] = process_marksheet(path, output_dir, names[path], write_pdf, write_excel, store_path,
+                                              consolidated, export_format, chart_backend)
+            if progress:
+                progress(results[path])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(process_marksheet, path, output_dir, names[path], write_pdf, write_excel,
+                                store_path, consolidated, export_format, chart_backend): path
+                for path in paths
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    results[path] = future.result()
+                except Exception as e:
+                    # A crashed worker (e.g. BrokenProcessPool) only fails its own file
+                    results[path] = {'file': path, 'students': 0, 'outputs': [],
+                                     'error': f"{type(e).__name__}: {e}", 'seconds': 0.0}
+                if progress:
+                    progress(results[path])
+
+    return [results[path] for path in paths]
+
+
+def summarize(results, elapsed):
+    """Build a throughput/failure summary for a finished batch."""
+    failures = [r for r in results if r['error']]
+    students = sum(r['students'] for r in results)
+    return {
+        'files': len(results),
+        'succeeded': len(results) - len(failures),
+        'failed': len(failures),
+        'students': students,
+        'elapsed': elapsed,
+        'files_per_second': len(results) / elapsed if elapsed > 0 else 0.0,
+        'students_per_second': students / elapsed if elapsed > 0 else 0.0,
+        'failures': failures
+    }
+
+
+def slowest_stage(result):
+    stages = result.get('stages')
+    if not stages:
+        return None
+    # 'parse' includes its sub-stages, so only leaf stages are compared
+    leaves = {name: seconds for name, seconds in stages.items() if name != 'parse'}
+    return max(leaves.items(), key=lambda item: item[1]) if leaves else None
+
+
+def print_summary(summary):
+    print("\n" + "=" * 60)
+    print("Batch summary")
+    print("=" * 60)
+    print(f"Files:        {summary['files']} ({summary['succeeded']} ok, {summary['failed']} failed)")
+    print(f"Students:     {summary['students']}")
+    print(f"Elapsed:      {summary['elapsed']:.2f}s")
+    print(f"Throughput:   {summary['files_per_second']:.2f} files/s, "
+          f"{summary['students_per_second']:.0f} students/s")
+    if summary['failures']:
+        print("\nFailures:")
+        for r in summary['failures']:
+            print(f"  {os.path.basename(r['file'])}: {r['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate semester reports for many mark sheets.")
+    parser.add_argument('inputs', nargs='+', help="Directories or glob patterns of .xls/.xlsx/.pdf mark sheets or .parquet/.arrow exports")
+    parser.add_argument('-o', '--output', default='reports', help="Output directory (default: reports)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--no-pdf', action='store_true', help="Skip PDF reports")
+    parser.add_argument('--no-excel', action='store_true', help="Skip Excel reports")
+    parser.add_argument('--store', metavar='DB', default=None,
+                        help="Also save parsed results to this SQLite results store")
+    parser.add_argument('--consolidated', action='store_true',
+                        help="Write one consolidated PDF with a section per subject for multi-subject workbooks")
+    parser.add_argument('--export', choices=['parquet', 'arrow'], default=None,
+                        help="Also write the parsed results as a Parquet or Arrow IPC export")
+    parser.add_argument('--pdf-charts', choices=['vector', 'matplotlib'], default=None,
+                        help="Draw PDF charts as vectors or as matplotlib images "
+                             "(default: EXAMTOOL_PDF_CHARTS, else vector)")
+    args = parser.parse_args(argv)
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    paths = find_marksheets(args.inputs, exclude_dir=args.output)
+    if not paths:
+        print("No mark sheets or exports found.")
+        return 1
+
+    print(f"Processing {len(paths)} mark sheet(s) into {args.output}...")
+
+    def progress(result):
+        status = "FAILED" if result['error'] else f"{result['students']} students"
+        slowest = slowest_stage(result)
+        detail = f", slowest: {slowest[0]} {slowest[1]:.2f}s" if slowest else ""
+        print(f"  [{status}] {os.path.basename(result['file'])} ({result['seconds']:.2f}s{detail})")
+
+    start = time.perf_counter()
+    results = run_batch(paths, args.output, workers=args.workers,
+                        write_pdf=not args.no_pdf, write_excel=not args.no_excel, progress=progress,
+                        store_path=args.store, consolidated=args.consolidated, export_format=args.export,
+                        chart_backend=args.pdf_charts)
+    summary = summarize(results, time.perf_counter() - start)
+    print_summary(summary)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""Benchmarks; run modules from the project root, e.g. python -m benchmarks.stages."""
+import subprocess
+
+
+def git_revision():
+    """Short hash of the checked-out commit, recorded with benchmark results."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
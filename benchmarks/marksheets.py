@@ -0,0 +1,115 @@
+"""
+Synthetic mark sheet workbooks in the exported layout (see excel_structure.txt).
+
+Course/Exam/Subject labels sit in column 6 of rows 1/3/5 with ':' in column 7 and the
+value in column 8, the '#' / 'Registration Number' / 'Grade' header is row 10 and
+students follow on alternating rows from row 12 with the grade in column 13.
+
+Run from the project root to write sample files:
+    python -m benchmarks.marksheets 5000 -o synthetic.xlsx
+"""
+import argparse
+import sys
+from io import BytesIO
+
+import numpy as np
+
+GRADES = ['AB', 'E', 'D', 'D+', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A', 'A+']
+# Rough shape of a real cohort: mostly A/B grades with a few absentees
+GRADE_WEIGHTS = [4, 2, 1, 1, 1, 2, 3, 4, 6, 10, 12, 34, 20]
+
+METADATA_ROWS = (
+    (1, 'Course', 'BSc in Applied Accounting  General Degree (2020 Curriculum)'),
+    (3, 'Exam', '18A WE YII SI ESE - AUG 2025'),
+    (5, 'Subject', 'Human Resource Management'),
+)
+TITLE_ROW = 8
+HEADER_ROW = 10
+FIRST_STUDENT_ROW = 12
+GRADE_COLUMN = 13
+
+# .xls sheets hold 65536 rows and students use every other row
+XLS_MAX_STUDENTS = (65536 - FIRST_STUDENT_ROW) // 2
+
+
+def marksheet_cells(n, seed=0, subject=None):
+    """Yield (row, column, value) for every non-empty cell of an n-student mark sheet."""
+    rng = np.random.default_rng(seed)
+    weights = np.asarray(GRADE_WEIGHTS, dtype=float)
+    grades = rng.choice(GRADES, size=n, p=weights / weights.sum())
+
+    for row, label, value in METADATA_ROWS:
+        if label == 'Subject' and subject:
+            value = subject
+        yield row, 6, label
+        yield row, 7, ':'
+        yield row, 8, value
+    yield TITLE_ROW, 0, 'Semester Mark Sheet'
+    yield HEADER_ROW, 0, '#'
+    yield HEADER_ROW, 1, 'Registration Number'
+    yield HEADER_ROW, GRADE_COLUMN, 'Grade'
+    for i in range(n):
+        row = FIRST_STUDENT_ROW + 2 * i
+        yield row, 0, i + 1
+        yield row, 1, f"BSc/2024-18A/WE-{i + 1:05d}"
+        yield row, GRADE_COLUMN, str(grades[i])
+
+
+def make_xlsx(n, seed=0, subject=None):
+    from openpyxl import Workbook
+
+    rows = {}
+    for row, col, value in marksheet_cells(n, seed, subject):
+        rows.setdefault(row, {})[col] = value
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    for row in range(max(rows) + 1):
+        cells = rows.get(row, {})
+        sheet.append([cells.get(col) for col in range(GRADE_COLUMN + 1)])
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def make_xls(n, seed=0, subject=None):
+    try:
+        import xlwt
+    except ImportError as e:
+        raise ImportError("Writing .xls mark sheets needs xlwt: pip install -r requirements-dev.txt") from e
+
+    if n > XLS_MAX_STUDENTS:
+        raise ValueError(f".xls sheets hold at most {XLS_MAX_STUDENTS} students in this layout")
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet('Sheet1')
+    for row, col, value in marksheet_cells(n, seed, subject):
+        sheet.write(row, col, value)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+MAKERS = {'xlsx': make_xlsx, 'xls': make_xls}
+
+
+def make_marksheet(n, fmt='xlsx', seed=0, subject=None):
+    """Return the bytes of a synthetic n-student mark sheet workbook in the given format."""
+    return MAKERS[fmt](n, seed, subject)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic mark sheet workbook.")
+    parser.add_argument('students', type=int, help="Number of students")
+    parser.add_argument('-o', '--output', required=True, help="Output .xlsx or .xls path")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    fmt = 'xls' if args.output.lower().endswith('.xls') else 'xlsx'
+    with open(args.output, 'wb') as f:
+        f.write(make_marksheet(args.students, fmt, args.seed))
+    print(f"Wrote {args.students} students to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Benchmark: parse, distribution, chart and PDF stages on synthetic mark sheets.
+
+Each stage is timed separately for every size and format, with caches cleared so the
+numbers are cold-path timings (the cached re-parse is reported as parse_cached). The
+caches are detached from any shared backend (EXAMTOOL_CACHE), which is never read,
+written or cleared here. Writing .xls sheets needs xlwt (requirements-dev.txt).
+Results are written as JSON so runs can be compared between versions.
+
+Run from the project root:
+    python -m benchmarks.stages -o bench.json
+    python -m benchmarks.stages --sizes 100 1000 --formats xlsx --compare bench.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from app import parse_semester_marksheet, calculate_grade_distribution, create_grade_chart_pdf, \
+    generate_pdf_report
+from benchmarks import git_revision
+from benchmarks.marksheets import XLS_MAX_STUDENTS, make_marksheet
+from charts import chart_renderer, smooth_curve
+from layouts import layout_cache
+from marksheet_cache import parse_cache, workbook_cache
+
+STAGES = ('parse', 'parse_cached', 'distribution', 'chart_pdf', 'pdf_report')
+
+# Process-local caches only: a shared backend may serve live workers, and would turn
+# cold timings into cache hits
+BENCHMARK_CACHES = (parse_cache, workbook_cache, chart_renderer.cache, layout_cache)
+for _cache in BENCHMARK_CACHES:
+    _cache.shared = None
+
+
+def clear_caches():
+    for cache in BENCHMARK_CACHES:
+        cache.clear()
+    smooth_curve.cache_clear()
+
+
+def best_of(func, repeat, setup=None):
+    """Return (best seconds, last result) over repeat runs; setup runs untimed before each."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_marksheet(data, repeat):
+    """Time every stage on one workbook's bytes. Returns {stage: seconds} and the student count."""
+    timings = {}
+    timings['parse'], (df, metadata) = best_of(lambda: parse_semester_marksheet(BytesIO(data)),
+                                               repeat, setup=clear_caches)
+    if df is None:
+        raise RuntimeError("Synthetic mark sheet failed to parse")
+    timings['parse_cached'], _ = best_of(lambda: parse_semester_marksheet(BytesIO(data)), repeat)
+    timings['distribution'], distribution_df = best_of(lambda: calculate_grade_distribution(df), repeat)
+    timings['chart_pdf'], _ = best_of(lambda: create_grade_chart_pdf(distribution_df), repeat,
+                                      setup=clear_caches)
+    timings['pdf_report'], _ = best_of(lambda: generate_pdf_report(df, metadata, distribution_df),
+                                       repeat, setup=clear_caches)
+    return timings, len(df)
+
+
+def run(sizes, formats, repeat=3, progress=None):
+    results = []
+    for fmt in formats:
+        for n in sizes:
+            if fmt == 'xls' and n > XLS_MAX_STUDENTS:
+                if progress:
+                    progress(f"skipping {n} students for .xls (limit {XLS_MAX_STUDENTS})")
+                continue
+            data = make_marksheet(n, fmt)
+            timings, students = bench_marksheet(data, repeat)
+            if students != n:
+                raise AssertionError(f"Parsed {students} of {n} students from synthetic .{fmt}")
+            results.append({'format': fmt, 'students': n, 'file_bytes': len(data), 'seconds': timings})
+            if progress:
+                progress(f"{fmt:>4} {n:>7}: " + ", ".join(f"{s} {timings[s]:.4f}s" for s in STAGES))
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'repeat': repeat,
+        'results': results
+    }
+
+
+def compare(current, baseline):
+    """Print per-stage speed ratios of current vs. baseline (>1 means faster now)."""
+    old = {(r['format'], r['students']): r['seconds'] for r in baseline['results']}
+    # Progress and comparisons go to stderr so stdout stays valid JSON
+    print(f"\nCompared with {baseline.get('revision') or 'baseline'} ({baseline.get('created')}):", file=sys.stderr)
+    print(f"{'format':>6} {'students':>9} " + " ".join(f"{s:>13}" for s in STAGES), file=sys.stderr)
+    for r in current['results']:
+        before = old.get((r['format'], r['students']))
+        if before is None:
+            continue
+        ratios = [before[s] / r['seconds'][s] if s in before and r['seconds'][s] > 0 else float('nan')
+                  for s in STAGES]
+        print(f"{r['format']:>6} {r['students']:>9} " + " ".join(f"{x:>12.2f}x" for x in ratios),
+              file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the parse, distribution, chart and PDF stages.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--formats', nargs='+', choices=['xls', 'xlsx'], default=['xls', 'xlsx'],
+                        help="Workbook formats to benchmark (xls needs xlwt, see requirements-dev.txt)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', default=None, help="Write results JSON here (default: stdout)")
+    parser.add_argument('--compare', metavar='JSON', default=None,
+                        help="Print speed ratios against an earlier results file")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.formats, args.repeat, progress=lambda line: print(line, file=sys.stderr))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Benchmark: cold start of the app.
+
+Each sample runs in a fresh interpreter and measures the time to import app.py and to
+render the start page once (no upload) through Streamlit's AppTest, and records which
+heavy chart/PDF libraries were loaded by then. Results are written as JSON.
+
+Run from the project root:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --samples 5 -o startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from benchmarks import git_revision
+
+HEAVY_MODULES = ('matplotlib', 'scipy', 'reportlab', 'openpyxl', 'xlrd')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter; prints one JSON line
+PROBE = """
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - start
+import_modules = [m for m in {heavy!r} if m in sys.modules]
+
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({app_path!r}, default_timeout=120).run()
+render_seconds = time.perf_counter() - start
+print(json.dumps({{
+    'import_seconds': import_seconds,
+    'first_render_seconds': render_seconds,
+    'heavy_modules_after_import': import_modules,
+    'heavy_modules_after_render': [m for m in {heavy!r} if m in sys.modules],
+    'exceptions': [str(e.value) for e in at.exception]
+}}))
+"""
+
+
+def sample():
+    """Measure one cold start in a new interpreter."""
+    code = PROBE.format(root=PROJECT_ROOT, heavy=HEAVY_MODULES, app_path=os.path.join(PROJECT_ROOT, 'app.py'))
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the results store of the sample away from the real one
+        env = dict(os.environ, EXAMTOOL_DB=os.path.join(tmp, 'results.db'))
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                             cwd=PROJECT_ROOT, env=env).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's cold start.")
+    parser.add_argument('--samples', type=int, default=3)
+    parser.add_argument('-o', '--output', default=None, help="Write results JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    samples = []
+    for i in range(args.samples):
+        samples.append(sample())
+        print(f"sample {i + 1}: import {samples[-1]['import_seconds']:.3f}s, "
+              f"first render {samples[-1]['first_render_seconds']:.3f}s", file=sys.stderr)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'import_seconds_median': statistics.median(s['import_seconds'] for s in samples),
+        'first_render_seconds_median': statistics.median(s['first_render_seconds'] for s in samples),
+        'samples': samples
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
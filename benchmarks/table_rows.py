@@ -0,0 +1,100 @@
+"""
+Benchmark: ReportLab row assembly with iterrows vs. the columnar builders in app.py.
+
+Run from the project root:
+    python -m benchmarks.table_rows
+    python -m benchmarks.table_rows --sizes 1000 10000 --min-speedup 5
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app import calculate_grade_distribution, distribution_table_rows, student_table_rows
+
+GRADES = ['AB', 'E', 'D', 'D+', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A', 'A+']
+
+
+def make_students(n, seed=0):
+    """Synthetic parsed mark sheet with n students."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        '#': [str(i) for i in range(1, n + 1)],
+        'Registration Number': [f"BSc/2024-18A/WE-{i:05d}" for i in range(1, n + 1)],
+        'Grade': rng.choice(GRADES, size=n)
+    })
+
+
+def legacy_student_rows(df):
+    """Row assembly as generate_pdf_report did it before the columnar builder."""
+    student_data = []
+    for _, row in df.iterrows():
+        student_data.append([
+            str(row['#'])[:5],
+            str(row['Registration Number'])[:35],
+            str(row['Grade'])
+        ])
+    return student_data
+
+
+def legacy_distribution_rows(distribution_df):
+    dist_data = []
+    for _, row in distribution_df.iterrows():
+        dist_data.append([row['Grade'], str(row['Count']), f"{row['Percentage']}%"])
+    return dist_data
+
+
+def best_of(func, arg, repeat):
+    """Return (best seconds, last result) over repeat runs."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, repeat=3):
+    results = []
+    for n in sizes:
+        df = make_students(n)
+        distribution_df = calculate_grade_distribution(df)
+
+        old_time, old_rows = best_of(legacy_student_rows, df, repeat)
+        new_time, new_rows = best_of(student_table_rows, df, repeat)
+        if old_rows != new_rows:
+            raise AssertionError(f"Student rows differ for n={n}")
+        if legacy_distribution_rows(distribution_df) != distribution_table_rows(distribution_df):
+            raise AssertionError(f"Distribution rows differ for n={n}")
+
+        results.append({'students': n, 'iterrows': old_time, 'columnar': new_time,
+                        'speedup': old_time / new_time if new_time > 0 else float('inf')})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF table row assembly.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-speedup', type=float, default=None,
+                        help="Exit non-zero if the columnar builder is not at least this much faster")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat)
+    print(f"{'Students':>10} {'iterrows (s)':>14} {'columnar (s)':>14} {'speedup':>9}")
+    for r in results:
+        print(f"{r['students']:>10} {r['iterrows']:>14.4f} {r['columnar']:>14.4f} {r['speedup']:>8.1f}x")
+
+    if args.min_speedup is not None:
+        slow = [r for r in results if r['speedup'] < args.min_speedup]
+        if slow:
+            print(f"Regression: speedup below {args.min_speedup}x for "
+                  f"{', '.join(str(r['students']) for r in slow)} students")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
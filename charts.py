@@ -0,0 +1,337 @@
+"""
+Grade distribution chart rendering shared by the web view and the PDF report.
+
+Charts are drawn on long-lived Agg figures (one per variant) and the rendered
+PNG/SVG bytes are cached by grade distribution, variant, format and dpi.
+matplotlib and SciPy are imported on the first render, not when this module loads.
+Many charts at once (e.g. a consolidated report) are drawn on a pool of processes.
+
+PDF reports draw their chart as a ReportLab vector Drawing by default (vector_chart),
+which needs no matplotlib, is smaller than a PNG and stays sharp at any zoom. Set
+EXAMTOOL_PDF_CHARTS=matplotlib (or pass backend='matplotlib') to embed PNGs instead.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from threading import Lock
+
+import numpy as np
+
+from marksheet_cache import LRUCache
+from shared_cache import shared_cache
+
+GRADE_COLORS = {
+    'A+': '#10b981', 'A': '#059669', 'A-': '#047857',
+    'B+': '#3b82f6', 'B': '#2563eb', 'B-': '#1d4ed8',
+    'C+': '#f59e0b', 'C': '#d97706', 'C-': '#b45309',
+    'D+': '#ef4444', 'D': '#dc2626', 'E': '#991b1b', 'F': '#7f1d1d'
+}
+DEFAULT_COLOR = '#6b7280'
+LINE_COLOR = '#b45309'
+
+# Figure size and default dpi per chart variant
+CHART_VARIANTS = {
+    'web': {'figsize': (14, 5), 'dpi': 200},
+    'pdf': {'figsize': (10, 5), 'dpi': 150},
+}
+
+# PDF chart backends and the size of the chart on the page, in points
+PDF_CHART_BACKENDS = ('vector', 'matplotlib')
+PDF_CHART_BACKEND = os.getenv('EXAMTOOL_PDF_CHARTS', 'vector')
+PDF_CHART_SIZE = (460, 255)
+
+
+def chart_series(distribution_df):
+    """Return (grades, counts) tuples for the chart, excluding AB (kept in the table only)."""
+    chart_data = distribution_df[~distribution_df['Grade'].isin(['AB'])]
+    return tuple(chart_data['Grade']), tuple(int(c) for c in chart_data['Count'])
+
+
+@lru_cache(maxsize=1)
+def spline_factory():
+    """scipy.interpolate.make_interp_spline, or None if SciPy is missing."""
+    try:
+        from scipy.interpolate import make_interp_spline
+    except ImportError:
+        return None
+    return make_interp_spline
+
+
+@lru_cache(maxsize=256)
+def smooth_curve(counts):
+    """Return (x, y) for the line overlay; a 300-point cubic B-spline when possible."""
+    x_pos = np.arange(len(counts))
+    y_vals = np.asarray(counts, dtype=float)
+
+    # Use simple line for small number of points or if scipy is missing
+    make_interp_spline = spline_factory() if len(x_pos) > 2 else None
+    if make_interp_spline is not None:
+        try:
+            spline = make_interp_spline(x_pos, y_vals, k=3)
+            x_smooth = np.linspace(x_pos.min(), x_pos.max(), 300)
+            # Ensure line doesn't dip below 0
+            return x_smooth, np.maximum(spline(x_smooth), 0)
+        except Exception:
+            pass
+    return x_pos, y_vals
+
+
+def _draw_bars_with_line(ax, grades, counts, width=0.8):
+    colors_list = [GRADE_COLORS.get(g, DEFAULT_COLOR) for g in grades]
+    ax.bar(grades, counts, color=colors_list, width=width, alpha=0.7)
+
+    if len(grades) > 2:  # Need at least 3 points for smooth curve
+        x, y = smooth_curve(tuple(counts))
+        ax.plot(x, y, color=LINE_COLOR, linewidth=2, linestyle='-', zorder=3)
+    else:
+        # Fallback for single/two points
+        ax.plot(grades, counts, color=LINE_COLOR, marker='o',
+                linewidth=2, markersize=8, markerfacecolor='white',
+                markeredgewidth=2, markeredgecolor=LINE_COLOR, zorder=3)
+    return colors_list
+
+
+def draw_web_chart(fig, grades, counts):
+    """Bar chart with smooth line overlay plus a percentage pie chart."""
+    ax1, ax2 = fig.subplots(1, 2)
+    colors_list = _draw_bars_with_line(ax1, grades, counts)
+
+    ax1.set_xlabel('Grade', fontsize=11, fontweight='bold')
+    ax1.set_ylabel('Count', fontsize=11, fontweight='bold')
+    ax1.set_title('Grade Distribution', fontsize=13, fontweight='bold')
+    ax1.grid(axis='y', alpha=0.3)
+
+    # Sheets where every student was absent have nothing to divide up
+    if sum(counts):
+        ax2.pie(counts, labels=grades, autopct='%1.1f%%',
+                colors=colors_list, startangle=90, textprops={'fontsize': 10})
+    else:
+        ax2.axis('off')
+    ax2.set_title('Grade Percentage', fontsize=13, fontweight='bold')
+
+
+def draw_pdf_chart(fig, grades, counts):
+    """Single bar chart with smooth line overlay and value labels."""
+    ax = fig.subplots(1, 1)
+    _draw_bars_with_line(ax, grades, counts, width=0.6)
+
+    ax.set_xlabel('Grade', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Number of Students', fontsize=12, fontweight='bold')
+    ax.set_title('Grade Distribution', fontsize=14, fontweight='bold', pad=20)
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+
+    # Add value labels on top of bars
+    for i, count in enumerate(counts):
+        ax.text(i, count, str(count), ha='center', va='bottom', fontweight='bold', fontsize=10)
+
+
+DRAW_FUNCTIONS = {'web': draw_web_chart, 'pdf': draw_pdf_chart}
+
+
+def pdf_chart_backend(backend=None):
+    """The PDF chart backend to use: backend, else EXAMTOOL_PDF_CHARTS (default 'vector')."""
+    backend = backend or PDF_CHART_BACKEND
+    if backend not in PDF_CHART_BACKENDS:
+        raise ValueError(f"Unknown PDF chart backend: {backend}")
+    return backend
+
+
+def axis_scale(max_count, ticks=5):
+    """(top, step) of a count axis with round tick steps and headroom for the value labels."""
+    raw = max(max_count * 1.1, 1) / ticks
+    magnitude = 10 ** int(np.floor(np.log10(raw)))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw)
+    step = max(int(step), 1)
+    return int(np.ceil(max(max_count * 1.1, 1) / step)) * step, step
+
+
+def vector_chart(grades, counts, width=PDF_CHART_SIZE[0], height=PDF_CHART_SIZE[1]):
+    """ReportLab Drawing of the PDF chart: grade-coloured bars, smooth line and value labels.
+
+    Same layout as draw_pdf_chart, drawn with reportlab.graphics instead of matplotlib.
+    """
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.graphics.shapes import Circle, Drawing, Group, PolyLine, String
+    from reportlab.lib import colors
+
+    grades, counts = list(grades), [int(c) for c in counts]
+    # The spline can overshoot the tallest bar; the axis covers it, as matplotlib's autoscale does
+    line_x, line_y = smooth_curve(tuple(counts)) if len(grades) > 2 else (np.arange(len(counts)), counts)
+    top, step = axis_scale(max(max(counts), float(np.max(line_y))))
+    drawing = Drawing(width, height)
+
+    chart = VerticalBarChart()
+    chart.x, chart.y = 48, 36
+    chart.width, chart.height = width - 60, height - 70
+    chart.data = [counts]
+    chart.valueAxis.valueMin, chart.valueAxis.valueMax, chart.valueAxis.valueStep = 0, top, step
+    chart.valueAxis.visibleGrid = True
+    chart.valueAxis.gridStrokeColor = colors.Color(0, 0, 0, alpha=0.3)
+    chart.valueAxis.gridStrokeDashArray = (3, 3)
+    chart.valueAxis.labels.fontSize = 8
+    chart.categoryAxis.categoryNames = grades
+    chart.categoryAxis.labels.fontSize = 8
+    # Bars fill 0.6 of each grade's slot, like the matplotlib chart
+    chart.barWidth, chart.groupSpacing = 6, 4
+    chart.bars.strokeColor = None
+    for i, grade in enumerate(grades):
+        color = colors.HexColor(GRADE_COLORS.get(grade, DEFAULT_COLOR))
+        chart.bars[(0, i)].fillColor = colors.Color(color.red, color.green, color.blue, alpha=0.7)
+    chart.barLabelFormat = '%d'
+    chart.barLabels.fontName = 'Helvetica-Bold'
+    chart.barLabels.fontSize = 8
+    chart.barLabels.boxAnchor = 's'
+    chart.barLabels.dy = 2
+    drawing.add(chart)
+
+    # Line overlay in the chart's coordinates: grade i is centred in slot i
+    slot = chart.width / len(grades)
+    line_color = colors.HexColor(LINE_COLOR)
+
+    line = [coordinate for x, y in zip(line_x, line_y)
+            for coordinate in (chart.x + (x + 0.5) * slot, chart.y + y / top * chart.height)]
+    drawing.add(PolyLine(line, strokeColor=line_color, strokeWidth=1.5))
+    if len(grades) <= 2:
+        # Too few points for a curve: markers on a straight line
+        for i in range(0, len(line), 2):
+            drawing.add(Circle(line[i], line[i + 1], 3.5, fillColor=colors.white, strokeColor=line_color,
+                               strokeWidth=1.5))
+
+    drawing.add(String(width / 2, height - 14, 'Grade Distribution', textAnchor='middle',
+                       fontName='Helvetica-Bold', fontSize=11))
+    drawing.add(String(chart.x + chart.width / 2, 6, 'Grade', textAnchor='middle',
+                       fontName='Helvetica-Bold', fontSize=9))
+    y_title = Group(String(0, 0, 'Number of Students', textAnchor='middle', fontName='Helvetica-Bold', fontSize=9))
+    y_title.translate(12, chart.y + chart.height / 2)
+    y_title.rotate(90)
+    drawing.add(y_title)
+    return drawing
+
+
+def pdf_vector_chart(distribution_df):
+    """vector_chart of a grade distribution, or None when there is nothing to plot."""
+    if len(distribution_df) == 0:
+        return None
+    grades, counts = chart_series(distribution_df)
+    return vector_chart(grades, counts) if len(grades) else None
+
+
+class ChartRenderer:
+    """Renders chart variants to image bytes on reused Agg figures, caching the output."""
+
+    def __init__(self, max_entries=128):
+        self.cache = LRUCache(max_entries, shared=shared_cache, namespace='chart')
+        self._figures = {}
+        self._lock = Lock()
+
+    def _figure(self, variant):
+        fig = self._figures.get(variant)
+        if fig is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+
+            fig = Figure(figsize=CHART_VARIANTS[variant]['figsize'])
+            FigureCanvasAgg(fig)
+            self._figures[variant] = fig
+        return fig
+
+    def render(self, distribution_df, variant='pdf', fmt='png', dpi=None):
+        """Return the chart as image bytes, or None when there is nothing to plot."""
+        if len(distribution_df) == 0:
+            return None
+        grades, counts = chart_series(distribution_df)
+        if len(grades) == 0:
+            return None
+        return self.render_series(grades, counts, variant, fmt, dpi)
+
+    def render_many(self, distribution_dfs, variant='pdf', fmt='png', dpi=None, max_workers=None):
+        """Render several charts, returning image bytes (or None) in input order.
+        
+        Charts that are not cached yet are drawn concurrently in worker processes, each
+        with its own figures, instead of one after another on this renderer's lock.
+        max_workers sizes the process pool (see chart_pool).
+        """
+        dpi = dpi or CHART_VARIANTS[variant]['dpi']
+        results = [None] * len(distribution_dfs)
+        pending = {}
+        for i, distribution_df in enumerate(distribution_dfs):
+            grades, counts = chart_series(distribution_df) if len(distribution_df) else ((), ())
+            if len(grades) == 0:
+                continue
+            key = (variant, fmt, dpi, tuple(grades), tuple(counts))
+            data = self.cache.get(key)
+            if data is not None:
+                results[i] = data
+            else:
+                # Subjects with the same distribution share one render
+                pending.setdefault(key, []).append(i)
+
+        pool = chart_pool(max_workers) if len(pending) > 1 else None
+        if pool is not None:
+            futures = {key: pool.submit(render_worker, key) for key in pending}
+            rendered = {key: future.result() for key, future in futures.items()}
+        else:
+            rendered = {key: self.render_series(key[3], key[4], variant, fmt, dpi) for key in pending}
+        for key, data in rendered.items():
+            self.cache.put(key, data)
+            for i in pending[key]:
+                results[i] = data
+        return results
+
+    def render_series(self, grades, counts, variant='pdf', fmt='png', dpi=None):
+        """Render a (grades, counts) series; results are cached per distribution vector."""
+        dpi = dpi or CHART_VARIANTS[variant]['dpi']
+        key = (variant, fmt, dpi, tuple(grades), tuple(counts))
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+
+        # Figures are shared between sessions, so drawing and saving is serialised
+        with self._lock:
+            fig = self._figure(variant)
+            fig.clear()
+            try:
+                DRAW_FUNCTIONS[variant](fig, list(grades), list(counts))
+                fig.tight_layout()
+                buffer = BytesIO()
+                fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+            finally:
+                fig.clear()
+        data = buffer.getvalue()
+        self.cache.put(key, data)
+        return data
+
+
+# Module-level renderer so figures and cached images survive Streamlit reruns
+chart_renderer = ChartRenderer()
+
+# Chart process pools by worker count
+_pools = {}
+_pool_lock = Lock()
+
+
+def render_worker(key):
+    """Process pool worker: render one (variant, fmt, dpi, grades, counts) key."""
+    variant, fmt, dpi, grades, counts = key
+    return chart_renderer.render_series(grades, counts, variant, fmt, dpi)
+
+
+def chart_pool(max_workers=None):
+    """Shared chart process pool with max_workers workers (default: CPU count), or None
+    when charts should be drawn inline.
+    
+    Worker processes (batch files, API renders), single-CPU machines and max_workers=1
+    draw inline. Pools are created on first use per worker count and then reused.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if workers < 2 or multiprocessing.parent_process() is not None:
+        return None
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # Spawned workers do not inherit locks held by the server's threads
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+        return pool
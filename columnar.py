@@ -0,0 +1,114 @@
+"""
+Columnar (Parquet / Arrow IPC) export and loading of parsed mark sheets.
+
+An export holds the student results of every sheet of a workbook in one table, one
+sheet after another, with a dictionary-encoded 'Sheet' column. Each sheet's metadata
+and grade counts, the parser version and the hash of the source file are kept in the
+schema metadata. Loading an export returns what read_semester_workbook returned for
+the source file without decoding any Excel, and downstream tools can read it directly
+with pyarrow, pandas or DuckDB. pyarrow is imported on first use.
+"""
+import json
+from io import BytesIO
+
+from grades import GRADE_ORDER, as_grades, grade_counts
+
+EXPORT_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+EXPORT_MIME_TYPES = {'parquet': 'application/vnd.apache.parquet', 'arrow': 'application/vnd.apache.arrow.file'}
+PARQUET_MAGIC = b'PAR1'
+ARROW_MAGIC = b'ARROW1'
+METADATA_KEY = b'examtool'
+RESULT_COLUMNS = ['#', 'Registration Number', 'Grade']
+
+
+def detect_export(data):
+    """'parquet' or 'arrow' for the bytes of an export, otherwise None."""
+    if data[:4] == PARQUET_MAGIC and data[-4:] == PARQUET_MAGIC:
+        return 'parquet'
+    if data[:6] == ARROW_MAGIC:
+        return 'arrow'
+    return None
+
+
+def results_table(sheets, parser_version='', source_hash=None):
+    """pyarrow Table of the parsed sheets [(sheet_name, df, metadata), ...] with metadata in the schema."""
+    import pyarrow as pa
+
+    def column(values, name):
+        return pa.chunked_array([pa.array(df[name].astype(str).to_numpy(), pa.string()) for _, df, _ in values],
+                                type=pa.string())
+
+    table = pa.table({
+        'Sheet': pa.chunked_array([pa.array([name] * len(df), pa.string()) for name, df, _ in sheets],
+                                  type=pa.string()).dictionary_encode(),
+        '#': column(sheets, '#'),
+        'Registration Number': column(sheets, 'Registration Number'),
+        'Grade': column(sheets, 'Grade').dictionary_encode()
+    })
+    info = {
+        'parser_version': parser_version,
+        'source_hash': source_hash,
+        'grade_order': list(GRADE_ORDER),
+        'sheets': [
+            {'name': name, 'students': len(df), 'metadata': dict(metadata),
+             'grade_counts': grade_counts(df['Grade']).tolist()}
+            for name, df, metadata in sheets
+        ]
+    }
+    return table.replace_schema_metadata({METADATA_KEY: json.dumps(info).encode('utf-8')})
+
+
+def export_results(sheets, output=None, fmt='parquet', parser_version='', source_hash=None):
+    """Write parsed sheets as Parquet or Arrow IPC to a path or file-like object.
+
+    Returns output, or a BytesIO with the export when output is None.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    table = results_table(sheets, parser_version, source_hash)
+    buffer = BytesIO() if output is None else output
+    if fmt == 'parquet':
+        pq.write_table(table, buffer)
+    else:
+        with pa.ipc.new_file(buffer, table.schema) as writer:
+            writer.write_table(table)
+    if output is not None:
+        return output
+    buffer.seek(0)
+    return buffer
+
+
+def _read_table(data):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fmt = detect_export(data)
+    if fmt is None:
+        raise ValueError("Not a Parquet or Arrow export")
+    reader = pa.BufferReader(data)
+    table = pq.read_table(reader) if fmt == 'parquet' else pa.ipc.open_file(reader).read_all()
+    metadata = table.schema.metadata or {}
+    if METADATA_KEY not in metadata:
+        raise ValueError("Export has no mark sheet metadata")
+    return table, json.loads(metadata[METADATA_KEY])
+
+
+def export_info(data):
+    """Schema metadata of an export: parser_version, source_hash and per-sheet metadata and grade counts."""
+    return _read_table(data)[1]
+
+
+def load_results(data):
+    """Load export bytes as (sheets, skipped), the same shape read_semester_workbook returns."""
+    table, info = _read_table(data)
+    sheets, offset = [], 0
+    for sheet in info['sheets']:
+        # Sheets are stored one after another, so each one is a zero-copy slice
+        df = table.slice(offset, sheet['students']).select(RESULT_COLUMNS).to_pandas()
+        df['Grade'] = as_grades(df['Grade'].astype(object))
+        sheets.append((sheet['name'], df, dict(sheet['metadata'])))
+        offset += sheet['students']
+    return sheets, {}
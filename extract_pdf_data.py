@@ -1,46 +1,113 @@
 """
-Script to extract data from report.pdf, save to file for review
+Bulk PDF mark sheet extraction: turn many PDF mark sheets into one dataset.
+
+Usage:
+    python extract_pdf_data.py "pdf_marksheets/" -o dataset.csv
+    python extract_pdf_data.py "exports/*.pdf" -o dataset.xlsx --store results.db
+
+Each PDF is parsed into the same (#, Registration Number, Grade) records and
+course/exam/subject metadata as an uploaded Excel mark sheet. Pages of all PDFs are
+extracted in parallel on a process pool (see marksheet_pdf.py).
 """
-import pdfplumber
-
-pdf_path = r"c:\Users\salu\Desktop\examtool 2\examtool\report.pdf"
-output_path = r"c:\Users\salu\Desktop\examtool 2\examtool\pdf_extracted_data.txt"
-
-with open(output_path, 'w', encoding='utf-8') as f:
-    f.write("=" * 60 + "\n")
-    f.write("Extracting data from report.pdf\n")
-    f.write("=" * 60 + "\n")
-
-    with pdfplumber.open(pdf_path) as pdf:
-        f.write(f"\nTotal pages: {len(pdf.pages)}\n")
-        
-        all_data = []
-        for i, page in enumerate(pdf.pages):
-            f.write(f"\n{'='*60}\n")
-            f.write(f"PAGE {i+1}\n")
-            f.write("="*60 + "\n")
-            
-            # Extract tables
-            tables = page.extract_tables()
-            if tables:
-                for j, table in enumerate(tables):
-                    f.write(f"\n--- Table {j+1} ---\n")
-                    for row in table:
-                        f.write(str(row) + "\n")
-                        all_data.append(row)
-            else:
-                # If no tables, extract text
-                text = page.extract_text()
-                if text:
-                    f.write("\n--- Text Content ---\n")
-                    f.write(text + "\n")
-
-print(f"Data saved to {output_path}")
-print("First 50 rows of extracted data:")
-with pdfplumber.open(pdf_path) as pdf:
-    for i, page in enumerate(pdf.pages[:2]):  # First 2 pages
-        tables = page.extract_tables()
-        if tables:
-            for table in tables:
-                for row in table[:25]:  # First 25 rows per page
-                    print(row)
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+DATASET_COLUMNS = ('File', 'Course', 'Exam', 'Subject', '#', 'Registration Number', 'Grade')
+
+
+def extract_pdfs(paths, progress=None):
+    """Parse many PDF mark sheets. Returns (sheets, failures).
+
+    sheets is a list of (path, df_students, metadata) in input order and failures maps
+    each path that could not be parsed to its error.
+    """
+    from app import parse_sheet_cells
+    from marksheet_pdf import read_pdf_cells_many
+
+    sheets, failures = [], {}
+    for path, cells in read_pdf_cells_many(paths):
+        try:
+            if isinstance(cells, Exception):
+                raise cells
+            df, metadata = parse_sheet_cells(*cells)
+        except Exception as e:
+            failures[path] = f"{type(e).__name__}: {e}"
+            if progress:
+                progress(path, None, failures[path])
+            continue
+        sheets.append((path, df, metadata))
+        if progress:
+            progress(path, df, None)
+    return sheets, failures
+
+
+def build_dataset(sheets):
+    """One row per student and file, with the file's metadata as columns."""
+    frames = []
+    for path, df, metadata in sheets:
+        frame = df.copy()
+        frame.insert(0, 'Subject', metadata['subject'])
+        frame.insert(0, 'Exam', metadata['exam'])
+        frame.insert(0, 'Course', metadata['course'])
+        frame.insert(0, 'File', os.path.basename(path))
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=list(DATASET_COLUMNS))
+    dataset = pd.concat(frames, ignore_index=True)
+    dataset['Grade'] = dataset['Grade'].astype(str)
+    return dataset
+
+
+def write_dataset(dataset, output):
+    if output.lower().endswith('.xlsx'):
+        dataset.to_excel(output, index=False, engine='openpyxl')
+    else:
+        dataset.to_csv(output, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract many PDF mark sheets into one dataset.")
+    parser.add_argument('inputs', nargs='+', help="Directories or glob patterns of .pdf mark sheets")
+    parser.add_argument('-o', '--output', default='pdf_dataset.csv',
+                        help="CSV or .xlsx file for the combined dataset (default: pdf_dataset.csv)")
+    parser.add_argument('--store', metavar='DB', default=None,
+                        help="Also save parsed results to this SQLite results store")
+    args = parser.parse_args(argv)
+
+    from batch import find_marksheets
+
+    paths = [path for path in find_marksheets(args.inputs) if path.lower().endswith('.pdf')]
+    if not paths:
+        print("No .pdf mark sheets found.")
+        return 1
+
+    def report(path, df, error):
+        if error:
+            print(f"  [FAILED] {os.path.basename(path)}: {error}")
+        else:
+            print(f"  [OK] {os.path.basename(path)}: {len(df)} students")
+
+    start = time.perf_counter()
+    sheets, failures = extract_pdfs(paths, progress=report)
+    dataset = build_dataset(sheets)
+    write_dataset(dataset, args.output)
+
+    if args.store:
+        from app import PDF_SHEET_NAME, store_results
+        from results_store import ResultsStore
+        store = ResultsStore(args.store)
+        stored = sum(store_results(path, [(PDF_SHEET_NAME, df, metadata)], store)
+                     for path, df, metadata in sheets)
+        print(f"Saved {stored} new sheet(s) to {args.store}")
+
+    print(f"Wrote {len(dataset)} rows from {len(sheets)} of {len(paths)} file(s) to {args.output} "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Grade scale and bincount-based grade counting.
+
+Grades are stored as an ordered pandas Categorical following GRADE_ORDER, so counting
+a column (or hundreds of subject columns at once) is a single np.bincount over the
+category codes instead of repeated string scans.
+"""
+import numpy as np
+import pandas as pd
+
+# Grade order - AB first, then worst to best
+GRADE_ORDER = ('AB', 'E', 'D', 'D+', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A', 'A+')
+ABSENT_GRADE = 'AB'
+
+# Letter groups shown in the Statistics panel
+GRADE_GROUPS = {
+    'A': ('A-', 'A', 'A+'),
+    'B': ('B-', 'B', 'B+')
+}
+GROUP_INDEXES = {group: [GRADE_ORDER.index(g) for g in grades] for group, grades in GRADE_GROUPS.items()}
+
+
+def is_grade_categorical(values):
+    dtype = getattr(values, 'dtype', None)
+    return isinstance(dtype, pd.CategoricalDtype) and \
+        tuple(dtype.categories[:len(GRADE_ORDER)]) == GRADE_ORDER and dtype.ordered
+
+
+def as_grades(values):
+    """Return grades as an ordered Categorical Series following GRADE_ORDER.
+
+    Values outside the scale (such as "N/A") are kept as extra categories after A+,
+    so no grade is lost; they are simply not part of the distribution.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if is_grade_categorical(series):
+        return series
+    extras = sorted(set(pd.unique(series.dropna())) - set(GRADE_ORDER), key=str)
+    return series.astype(pd.CategoricalDtype(list(GRADE_ORDER) + extras, ordered=True))
+
+
+def grade_codes(values):
+    """Category codes of the grades: 0..len(GRADE_ORDER)-1 for scale grades, larger or -1 otherwise."""
+    return as_grades(values).cat.codes.to_numpy()
+
+
+def grade_counts(values):
+    """Count of every grade in GRADE_ORDER, in one bincount pass."""
+    codes = grade_codes(values)
+    n = len(GRADE_ORDER)
+    return np.bincount(codes[(codes >= 0) & (codes < n)], minlength=n)
+
+
+def grade_count_matrix(columns):
+    """Counts for many grade columns at once: a (len(columns), len(GRADE_ORDER)) array.
+
+    Every column's codes are offset into its own row block and counted with a single
+    bincount, so hundreds of subjects cost one pass over all their grades.
+    """
+    n = len(GRADE_ORDER)
+    offset_codes = []
+    for row, values in enumerate(columns):
+        codes = grade_codes(values).astype(np.int64)
+        offset_codes.append(codes[(codes >= 0) & (codes < n)] + row * n)
+    if not offset_codes:
+        return np.zeros((0, n), dtype=np.int64)
+    counts = np.bincount(np.concatenate(offset_codes), minlength=len(offset_codes) * n)
+    return counts.reshape(len(offset_codes), n)
+
+
+def distribution_frame(counts, total):
+    """Grade / Count / Percentage table for one row of grade counts."""
+    return pd.DataFrame({
+        'Grade': list(GRADE_ORDER),
+        'Count': np.asarray(counts, dtype=np.int64),
+        'Percentage': [round((count / total) * 100, 1) if total > 0 else 0 for count in counts]
+    })
+
+
+def grade_statistics(counts):
+    """A/B group totals and the most common grade (AB excluded) from one row of counts."""
+    counts = np.asarray(counts)
+    stats = {group: int(counts[indexes].sum()) for group, indexes in GROUP_INDEXES.items()}
+    graded = counts.copy()
+    graded[GRADE_ORDER.index(ABSENT_GRADE)] = 0
+    stats['most_common'] = GRADE_ORDER[int(graded.argmax())] if graded.any() else None
+    return stats
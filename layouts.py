@@ -0,0 +1,194 @@
+"""
+Mark sheet layout detection.
+
+Mark sheets come from several templates: the semester mark sheet (Course/Exam/Subject
+labels above a '#' / 'Registration Number' / 'Grade' table), system DataGrid exports
+(the table header in the first row, no metadata) and others. A SheetLayout records
+where a template keeps its table and metadata: the header row, the number,
+registration and grade columns and the cells holding course, exam and subject.
+
+The first PROBE_ROWS rows of a sheet are read first. Their label cells (table header
+labels and metadata labels, not the values next to them) fingerprint the template, and
+the layout detected for a fingerprint is cached, so later sheets of the same template
+only have their student columns and metadata cells read. Sheets of an unknown template
+are detected from scratch; when no table header is found the fixed semester mark sheet
+layout is used, as before.
+"""
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from marksheet_cache import LRUCache
+from revisions import UNKNOWN_METADATA
+from shared_cache import shared_cache
+
+PROBE_ROWS = 20
+METADATA_LABELS = ('course', 'exam', 'subject')
+
+# Table header labels, matched against stripped, lower-cased cell text
+HEADER_PATTERNS = {
+    'number': r'^(?:#|no\.?|s\.?\s*no\.?)$',
+    'registration': r'^reg(?:istration)?\.?\s*(?:no\.?|num(?:ber)?)?$',
+    'grade': r'^grade$'
+}
+METADATA_PATTERN = f"^({'|'.join(METADATA_LABELS)})"
+# Registration numbers such as BSc/2024-18A/WE-001: no spaces, a '/' and a digit
+REGISTRATION_PATTERN = r'^(?=\S*\d)\S+/\S+$'
+SAMPLE_ROWS = 10
+
+
+class SheetLayout(namedtuple('SheetLayout', 'header_row number_column registration_column grade_column '
+                                            'metadata_cells')):
+    """Where a template keeps its student table and metadata.
+
+    number_column is None for templates without a '#' column (rows are numbered in
+    order); metadata_cells maps course/exam/subject to the (row, column) of their value,
+    or is None to search the header block for the labels.
+    """
+    __slots__ = ()
+
+    @property
+    def start_row(self):
+        return self.header_row + 1
+
+    @property
+    def columns(self):
+        """Sheet columns to read: number (when present), registration number and grade."""
+        if self.number_column is None:
+            return self.registration_column, self.grade_column
+        return self.number_column, self.registration_column, self.grade_column
+
+
+# The semester mark sheet: students from row 8 in columns 0, 1 and 13, metadata by label
+DEFAULT_LAYOUT = SheetLayout(7, 0, 1, 13, None)
+
+DETECTED = 'detected'
+CACHED = 'cached'
+DEFAULT = 'default'
+
+
+def _cell_text(block):
+    """Stripped text and its lower-cased form for every cell, as (rows, columns) arrays; '' when empty."""
+    values = block.to_numpy(dtype=object)
+    text = pd.Series(values.ravel(), dtype=object).map(lambda v: '' if v is None or v != v else str(v)).str.strip()
+    return text.to_numpy(dtype=object).reshape(values.shape), text.str.lower().to_numpy(dtype=object).reshape(values.shape)
+
+
+def _labels(lower):
+    """Label matches: {kind: [(row, column), ...]} for header labels and metadata labels."""
+    cells = pd.Series(lower.ravel(), dtype=object)
+    n_cols = lower.shape[1]
+    labels = {}
+    for kind, pattern in HEADER_PATTERNS.items():
+        labels[kind] = [divmod(int(pos), n_cols) for pos in np.flatnonzero(cells.str.match(pattern).to_numpy(dtype=bool))]
+    metadata = cells.str.extract(METADATA_PATTERN, expand=False)
+    for pos in np.flatnonzero(metadata.notna().to_numpy()):
+        labels.setdefault(metadata.iat[pos], []).append(divmod(int(pos), n_cols))
+    return labels
+
+
+def template_fingerprint(block):
+    """Hash of a sheet's template: its label cells and where the values they locate sit.
+
+    Table header rows are taken in full and metadata labels by position, together with
+    the offset of each label's value cell and any registration column found from its
+    values, since a cached SheetLayout reads those cells directly. Values themselves
+    (course names, registration numbers, grades) do not take part, so every sheet of a
+    template shares the fingerprint.
+    """
+    text, lower = _cell_text(block)
+    labels = _labels(lower)
+    header_rows = sorted({row for kind in HEADER_PATTERNS for row, _ in labels[kind]})
+    values = _metadata_cells(text, labels, header_row=len(text), latest=False)
+    unlabelled = [(row, _registration_column(text, row, exclude=[column]))
+                  for row, column in labels['grade']
+                  if not any(r == row for r, _ in labels['registration'])]
+    parts = [lower.shape[1]] + [(row, tuple(lower[row])) for row in header_rows] + \
+        [(key, tuple(labels.get(key, []))) for key in METADATA_LABELS] + [values, unlabelled]
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _registration_column(text, header_row, exclude):
+    """Unlabelled registration column: the one whose values below the header look like registration numbers."""
+    sample = text[header_row + 1:header_row + 1 + SAMPLE_ROWS]
+    if len(sample) == 0:
+        return None
+    matches = pd.DataFrame(sample).apply(lambda column: column.str.match(REGISTRATION_PATTERN)).sum().to_numpy().copy()
+    matches[list(exclude)] = 0
+    best = int(matches.argmax())
+    return best if matches[best] * 2 >= len(sample) else None
+
+
+def _metadata_cells(text, labels, header_row, latest=True):
+    """(row, column) of the value right of each metadata label above the table.
+
+    With latest=False every label's value cell is listed, as (key, label, value) cells.
+    """
+    cells = {} if latest else []
+    for key in METADATA_LABELS:
+        # Later labels win, as in the label search over the header block
+        for row, column in labels.get(key, []):
+            if row >= header_row:
+                continue
+            following = [j for j in range(column + 1, text.shape[1]) if text[row, j] not in ('', ':')]
+            if not following:
+                continue
+            if latest:
+                cells[key] = (row, following[0])
+            else:
+                cells.append((key, (row, column), (row, following[0])))
+    return cells
+
+
+def detect_layout(block):
+    """Find the student table header and the metadata cells in a sheet's first rows.
+
+    Returns a SheetLayout, or None when no row has a grade label and a registration
+    number column.
+    """
+    if block.empty:
+        return None
+    text, lower = _cell_text(block)
+    labels = _labels(lower)
+    for header_row, grade_column in labels['grade']:
+        in_row = {kind: [column for row, column in labels[kind] if row == header_row]
+                  for kind in ('number', 'registration')}
+        registration_column = in_row['registration'][0] if in_row['registration'] else \
+            _registration_column(text, header_row, exclude=[grade_column] + in_row['number'])
+        if registration_column is None:
+            continue
+        number_column = in_row['number'][0] if in_row['number'] else None
+        return SheetLayout(header_row, number_column, registration_column, grade_column,
+                           _metadata_cells(text, labels, header_row))
+    return None
+
+
+def metadata_from_cells(block, layout):
+    """Course/exam/subject read straight from a layout's metadata cells."""
+    metadata = dict(UNKNOWN_METADATA)
+    for key, (row, column) in layout.metadata_cells.items():
+        if row < block.shape[0] and column < block.shape[1]:
+            value = block.iat[row, column]
+            if value is not None and value == value and str(value).strip():
+                metadata[key] = str(value).strip()
+    return metadata
+
+
+# Detected layouts by template fingerprint; shared with other processes when a shared cache is set
+layout_cache = LRUCache(max_entries=64, shared=shared_cache, namespace='layout')
+
+
+def resolve_layout(block, cache=layout_cache):
+    """(layout, how) for a sheet's first PROBE_ROWS rows; how is 'cached', 'detected' or 'default'."""
+    fingerprint = template_fingerprint(block) if not block.empty else None
+    if fingerprint is not None:
+        layout = cache.get(fingerprint)
+        if layout is not None:
+            return layout, CACHED
+    layout = detect_layout(block)
+    if layout is None:
+        return DEFAULT_LAYOUT, DEFAULT
+    cache.put(fingerprint, layout)
+    return layout, DETECTED
@@ -0,0 +1,142 @@
+"""In-memory LRU caches for parsed mark sheets and rendered outputs, keyed by content.
+
+A cache can be backed by a shared_cache backend: misses are looked up there (and kept
+locally on a hit) and new entries are written through, so other processes reuse them.
+"""
+import hashlib
+import pickle
+from collections import OrderedDict
+from threading import Lock
+
+from shared_cache import cache_key, shared_cache
+
+
+def content_hash(data, version=""):
+    """Return a cache key for raw file bytes combined with a parser version."""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{version}:{digest}" if version else digest
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache with hit/miss counters.
+
+    With a shared backend, values are pickled into it under namespace-prefixed keys.
+    The shared level is best effort: its errors count as misses and skipped writes.
+    """
+
+    def __init__(self, max_entries=32, shared=None, namespace=None):
+        self.max_entries = max_entries
+        self.shared = shared
+        self.namespace = namespace or type(self).__name__
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        value = self._shared_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.shared_hits += 1
+        self._store(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full."""
+        self._store(key, value)
+        self._shared_set(key, value)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _shared_get(self, key):
+        if self.shared is None:
+            return None
+        try:
+            data = self.shared.get(cache_key(self.namespace, key))
+            return None if data is None else pickle.loads(data)
+        except Exception:
+            return None
+
+    def _shared_set(self, key, value):
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(cache_key(self.namespace, key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.shared_hits = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared_hits': self.shared_hits,
+                'size': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ParseCache(LRUCache):
+    """LRU cache of (student DataFrame, metadata) pairs; callers get their own copies."""
+
+    def get(self, key):
+        """Return a copy of the cached (df, metadata) for key, or None on a miss."""
+        entry = super().get(key)
+        if entry is None:
+            return None
+        df, metadata = entry
+        return df.copy(), dict(metadata)
+
+    def put(self, key, df, metadata):
+        super().put(key, (df.copy(), dict(metadata)))
+
+
+class WorkbookCache(LRUCache):
+    """LRU cache of whole-workbook parses: ([(sheet_name, df, metadata), ...], skipped sheets)."""
+
+    @staticmethod
+    def _copy(entry):
+        sheets, skipped = entry
+        return [(name, df.copy(), dict(metadata)) for name, df, metadata in sheets], dict(skipped)
+
+    def get(self, key):
+        """Return a copy of the cached (sheets, skipped) for key, or None on a miss."""
+        entry = super().get(key)
+        return None if entry is None else self._copy(entry)
+
+    def put(self, key, sheets, skipped):
+        super().put(key, self._copy((sheets, skipped)))
+
+
+# Module-level caches so they survive Streamlit script reruns
+parse_cache = ParseCache(shared=shared_cache, namespace='parse')
+workbook_cache = WorkbookCache(max_entries=16, shared=shared_cache, namespace='workbook')
+# Results fingerprints of a parsed upload's sheets, so reruns do not rehash the tables
+fingerprint_cache = LRUCache(max_entries=16)
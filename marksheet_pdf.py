@@ -0,0 +1,164 @@
+"""
+PDF mark sheet reader.
+
+Mark sheets exported as PDF have "Course : ...", "Exam : ..." and "Subject : ..." lines
+at the top of the first page and a '#' / 'Registration Number' / 'Grade' table on every
+page. Page ranges are extracted in parallel on a process pool; each worker opens the PDF
+once and releases every page as soon as its table has been read, so only one page per
+worker is held in memory. The header block and student columns are shaped as in
+MarksheetWorkbook.read_layout_cells, so metadata and student records go through the
+same parsing rules as Excel files.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from itertools import repeat
+from threading import Lock
+
+import pandas as pd
+
+PDF_SIGNATURE = b'%PDF-'
+PAGES_PER_TASK = 8
+HEADER_LINES = 15
+
+_pool = None
+_pool_lock = Lock()
+
+
+def is_pdf(data):
+    """True if the bytes look like a PDF (the signature may follow a little leading junk)."""
+    return PDF_SIGNATURE in data[:1024]
+
+
+def _open(source):
+    import pdfplumber
+    return pdfplumber.open(BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _header_rows(text):
+    """Split the first page's top lines into [label, ':', value] cells like the Excel header."""
+    rows = []
+    for line in (text or '').splitlines()[:HEADER_LINES]:
+        label, sep, value = line.partition(':')
+        rows.append([label.strip(), ':', value.strip()] if sep else [line.strip(), None, None])
+    return rows
+
+
+def _cell(value):
+    if value is None:
+        return None
+    value = value.strip()
+    return value or None
+
+
+def extract_page_range(source, start, stop):
+    """Process pool worker: (first page text or None, student table rows) for pages [start, stop)."""
+    header, rows = None, []
+    with _open(source) as pdf:
+        for number in range(start, min(stop, len(pdf.pages))):
+            page = pdf.pages[number]
+            if number == 0:
+                header = page.extract_text()
+            for table in page.extract_tables():
+                # '#', 'Registration Number' and 'Grade' (last column); header rows are dropped later
+                rows.extend((_cell(row[0]), _cell(row[1]), _cell(row[-1])) for row in table if len(row) >= 3)
+            # Release the page's parsed layout before moving on
+            page.close()
+    return header, rows
+
+
+def page_count(source):
+    with _open(source) as pdf:
+        return len(pdf.pages)
+
+
+def page_pool():
+    """Shared process pool for page extraction, or None inside a worker process.
+
+    Batch workers already run one file per process, so they extract pages inline.
+    """
+    global _pool
+    if multiprocessing.parent_process() is not None:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers do not inherit locks held by the server's threads
+            _pool = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 4),
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def discard_pool():
+    """Drop a broken pool so the next call starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def page_ranges(n_pages, pages_per_task=PAGES_PER_TASK):
+    return [(start, min(start + pages_per_task, n_pages)) for start in range(0, n_pages, pages_per_task)]
+
+
+def cells_from_pages(results):
+    """Build (header_block, student_columns) from page range results in page order."""
+    results = list(results)
+    header = results[0][0] if results else None
+    rows = [row for _, page_rows in results for row in page_rows]
+    header_block = pd.DataFrame(_header_rows(header), dtype=object)
+    student_columns = pd.DataFrame(rows, columns=[0, 1, 2], dtype=object)
+    return header_block, student_columns
+
+
+def read_pdf_cells(source, pages_per_task=PAGES_PER_TASK):
+    """Read the header block and student columns of a PDF mark sheet (bytes or path).
+
+    Returns (header_block, student_columns) DataFrames like MarksheetWorkbook.read_layout_cells.
+    PDFs with more than one range of pages are extracted on the shared process pool.
+    """
+    ranges = page_ranges(page_count(source), pages_per_task)
+    pool = page_pool() if len(ranges) > 1 else None
+    if pool is not None:
+        try:
+            return cells_from_pages(pool.map(extract_page_range, repeat(source), *zip(*ranges)))
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); retry this file inline
+            discard_pool()
+    return cells_from_pages(extract_page_range(source, start, stop) for start, stop in ranges)
+
+
+def read_pdf_cells_many(sources, pages_per_task=PAGES_PER_TASK):
+    """Yield (source, (header_block, student_columns) or exception) for many PDFs in order.
+
+    Page ranges of every PDF are queued on the shared pool up front, so small and large
+    files are extracted side by side.
+    """
+    pool = page_pool()
+    jobs = []
+    for source in sources:
+        try:
+            ranges = page_ranges(page_count(source), pages_per_task)
+            futures = [pool.submit(extract_page_range, source, start, stop) for start, stop in ranges] \
+                if pool is not None else None
+            jobs.append((source, ranges, futures, None))
+        except Exception as e:
+            jobs.append((source, None, None, e))
+
+    for source, ranges, futures, error in jobs:
+        if error is not None:
+            yield source, error
+            continue
+        try:
+            try:
+                results = [future.result() for future in futures] if futures is not None else None
+            except BrokenProcessPool:
+                discard_pool()
+                results = None
+            if results is None:
+                results = [extract_page_range(source, start, stop) for start, stop in ranges]
+            yield source, cells_from_pages(results)
+        except Exception as e:
+            yield source, e
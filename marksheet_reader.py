@@ -0,0 +1,209 @@
+"""
+Targeted cell reader for mark sheet workbooks.
+
+Instead of decoding the whole first sheet with pd.read_excel, only the header
+block and the student columns it locates (see layouts.py) are pulled: .xlsx through openpyxl's read-only
+streaming mode and legacy .xls through xlrd with on-demand sheet loading.
+Values are normalised the same way pd.read_excel(header=None) would, so the
+parser sees identical data.
+"""
+from io import BytesIO
+from itertools import islice
+from threading import Lock
+
+import pandas as pd
+
+XLSX_SIGNATURE = b'PK\x03\x04'
+XLS_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Strings pd.read_excel treats as missing by default
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+
+def detect_format(data):
+    """Return 'xlsx' or 'xls' from the file signature, or None if unrecognised."""
+    if data.startswith(XLSX_SIGNATURE):
+        return 'xlsx'
+    if data.startswith(XLS_SIGNATURE):
+        return 'xls'
+    return None
+
+
+def _normalise(value):
+    """Convert a raw cell value the way pandas' Excel readers do."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return None if value in NA_STRINGS else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _to_series(values, index=None, context=()):
+    """Build an object Series, widening to float when pandas would infer a numeric column.
+
+    pd.read_excel infers dtypes over the whole sheet column, so values of the same
+    column from rows that were not included (context) take part in the inference.
+    """
+    series = pd.Series(values, index=index, dtype=object)
+    present = [v for v in list(context) + values if v is not None]
+    if len(present) and len(present) < len(series) + len(context) and all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        # An all-numeric column with gaps becomes float64 in pd.read_excel
+        series = series.astype(float)
+    return series
+
+
+def _frame(rows, n_cols, first_row=0, context_rows=()):
+    """Build a DataFrame from row tuples padded/truncated to n_cols."""
+    columns = [[] for _ in range(n_cols)]
+    for row in rows:
+        for j in range(n_cols):
+            columns[j].append(_normalise(row[j]) if j < len(row) else None)
+    context = [[_normalise(row[j]) if j < len(row) else None for row in context_rows] for j in range(n_cols)]
+    index = pd.RangeIndex(first_row, first_row + len(rows))
+    return pd.DataFrame({j: _to_series(col, index, context[j]) for j, col in enumerate(columns)}, index=index)
+
+
+def _trim_trailing_empty(rows):
+    """Drop empty rows at the end of the sheet (end of data)."""
+    end = len(rows)
+    while end and all(_normalise(v) is None for v in rows[end - 1]):
+        end -= 1
+    return rows[:end]
+
+
+def _used_width(row):
+    """Number of columns up to the last non-empty cell in a row."""
+    for j in range(len(row) - 1, -1, -1):
+        if row[j] is not None and row[j] != '':
+            return j + 1
+    return 0
+
+
+def _read_xlsx_sheet(sheet, header_rows, resolve):
+    # Dimension records in the file can be stale; read the rows that are actually there
+    sheet.reset_dimensions()
+    rows = sheet.iter_rows(values_only=True)
+
+    # The header block is buffered in full and decides which columns are kept after it
+    probe = list(islice(rows, header_rows))
+    header = _trim_trailing_empty(probe)
+    header_block = _frame(header, max((_used_width(r) for r in header), default=0))
+    layout = resolve(header_block)
+    columns, start_row = layout.columns, layout.start_row
+    required = max(columns) + 1
+
+    # Rest of the single streaming pass: only student columns
+    width = max((_used_width(r) for r in probe), default=0)
+    body = [tuple(row[c] if c < len(row) else None for c in columns) for row in probe[start_row:]]
+    for i, row in enumerate(rows, len(probe)):
+        if width < required:
+            width = max(width, _used_width(row))
+        if i >= start_row:
+            body.append(tuple(row[c] if c < len(row) else None for c in columns))
+
+    # pd.read_excel would produce a frame too narrow to hold the grade column
+    if width < required:
+        raise IndexError(f"Sheet has {width} columns; column {required} is required")
+
+    return header, header_block, _trim_trailing_empty(body), layout
+
+
+def _read_xls_sheet(sheet, datemode, header_rows, resolve):
+    import xlrd
+
+    def cell_values(values, types):
+        # Match pandas: errors are missing, dates become datetimes, booleans stay booleans
+        out = []
+        for value, ctype in zip(values, types):
+            if ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                out.append(None)
+            elif ctype == xlrd.XL_CELL_DATE:
+                try:
+                    out.append(xlrd.xldate.xldate_as_datetime(value, datemode))
+                except Exception:
+                    out.append(value)
+            elif ctype == xlrd.XL_CELL_BOOLEAN:
+                out.append(bool(value))
+            else:
+                out.append(value)
+        return out
+
+    header = _trim_trailing_empty([cell_values(sheet.row_values(i), sheet.row_types(i))
+                                   for i in range(min(header_rows, sheet.nrows))])
+    n_cols = sheet.ncols
+    header_block = _frame(header, n_cols)
+    layout = resolve(header_block)
+    columns, start_row = layout.columns, layout.start_row
+    if n_cols <= max(columns):
+        raise IndexError(f"Sheet has {n_cols} columns; column {max(columns) + 1} is required")
+
+    student_cols = [cell_values(sheet.col_values(c, start_rowx=start_row),
+                                sheet.col_types(c, start_rowx=start_row)) for c in columns]
+    body = list(zip(*student_cols)) if student_cols else []
+    return header, header_block, _trim_trailing_empty(body), layout
+
+
+class MarksheetWorkbook:
+    """A workbook opened once from its bytes, from which any sheet's cells can be read.
+
+    Sheets may be read concurrently from several threads; the underlying workbook is
+    only decoded once.
+    """
+
+    def __init__(self, data):
+        self.format = detect_format(data)
+        self._lock = Lock()
+        if self.format == 'xlsx':
+            from openpyxl import load_workbook
+            self._book = load_workbook(BytesIO(data), read_only=True, data_only=True)
+            self.sheet_names = list(self._book.sheetnames)
+        elif self.format == 'xls':
+            import xlrd
+            self._book = xlrd.open_workbook(file_contents=data, on_demand=True)
+            self.sheet_names = self._book.sheet_names()
+        else:
+            raise ValueError("Not an .xlsx or .xls workbook")
+
+    def read_layout_cells(self, sheet, resolve, header_rows=15):
+        """Read the header block and the student columns of one sheet (by index or name).
+
+        resolve is called with the header block (the first header_rows rows, every column)
+        and returns a layout with start_row and columns attributes; only those columns are
+        read from the rest of the sheet. Returns (header_block, student_columns, layout),
+        where student_columns is indexed by sheet row.
+        """
+        index = self.sheet_names.index(sheet) if isinstance(sheet, str) else sheet
+        if self.format == 'xlsx':
+            header, header_block, body, layout = _read_xlsx_sheet(
+                self._book.worksheets[index], header_rows, resolve)
+        else:
+            # xlrd loads on-demand sheets through a shared stream position
+            with self._lock:
+                xls_sheet = self._book.sheet_by_index(index)
+            header, header_block, body, layout = _read_xls_sheet(
+                xls_sheet, self._book.datemode, header_rows, resolve)
+
+        # Rows above the student block take part in the student columns' dtype inference
+        columns, start_row = layout.columns, layout.start_row
+        above = [tuple(row[c] if c < len(row) else None for c in columns) for row in header[:start_row]]
+        student_columns = _frame(body, len(columns), first_row=start_row, context_rows=above)
+        student_columns.columns = list(columns)
+        return header_block, student_columns, layout
+
+    def close(self):
+        if self.format == 'xlsx':
+            self._book.close()
+        else:
+            self._book.release_resources()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,195 @@
+"""
+Per-stage timing instrumentation.
+
+Code wraps each hot-path stage in `with stage('name') as record:`; the stage's wall time,
+optional tracemalloc peak and row count are recorded into the active RunMetrics (one per
+Streamlit rerun, batch file or API request), added to process-wide totals that can be
+exported as Prometheus text, and logged as one JSON line on the 'examtool.metrics' logger.
+
+tracemalloc runs only while some unfinished run tracks memory (it slows every thread
+in the process). Its peaks are process-wide: allocations by other threads or sessions
+during a stage count towards that stage's peak.
+"""
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+logger = logging.getLogger('examtool.metrics')
+
+# EXAMTOOL_METRICS_LOG=1 writes the JSON stage lines to stderr without configuring logging
+if os.getenv('EXAMTOOL_METRICS_LOG') and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_active_run = ContextVar('examtool_metrics_run', default=None)
+_active_stage = ContextVar('examtool_metrics_stage', default=None)
+
+# Unfinished runs tracking memory; tracemalloc is stopped when the last one finishes
+_memory_runs = 0
+_started_tracing = False
+_tracing_lock = Lock()
+
+
+def _acquire_tracing():
+    global _memory_runs, _started_tracing
+    with _tracing_lock:
+        _memory_runs += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+
+
+def _release_tracing():
+    global _memory_runs, _started_tracing
+    with _tracing_lock:
+        _memory_runs -= 1
+        # Tracing started outside this module (e.g. PYTHONTRACEMALLOC) is left alone
+        if _memory_runs == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+class StageRecord:
+    """One timed stage: seconds, tracemalloc peak above its start (if tracked) and rows."""
+
+    __slots__ = ('name', 'seconds', 'peak_bytes', 'rows', 'labels', '_start_bytes', '_child_peak')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.seconds = 0.0
+        self.peak_bytes = None
+        self.rows = None
+        self.labels = labels
+        self._start_bytes = 0
+        self._child_peak = 0
+
+    def as_dict(self):
+        return {'stage': self.name, 'seconds': round(self.seconds, 6), 'rows': self.rows,
+                'peak_bytes': self.peak_bytes, **self.labels}
+
+
+class RunMetrics:
+    """Stage records of one run (a rerun, a batch file or a request), in completion order."""
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.records = []
+        self._lock = Lock()
+        self._finished = False
+        if track_memory:
+            _acquire_tracing()
+
+    def finish(self):
+        """End the run; memory tracing stops once no unfinished run tracks memory."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        if self.track_memory:
+            _release_tracing()
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def as_rows(self):
+        """Records as dicts, ready for a DataFrame or JSON."""
+        with self._lock:
+            return [record.as_dict() for record in self.records]
+
+
+class StageTotals:
+    """Process-wide counters per stage: runs, seconds and rows."""
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = Lock()
+
+    def add(self, record):
+        with self._lock:
+            totals = self._totals.setdefault(record.name, {'runs': 0, 'seconds': 0.0, 'rows': 0})
+            totals['runs'] += 1
+            totals['seconds'] += record.seconds
+            totals['rows'] += record.rows or 0
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(totals) for name, totals in self._totals.items()}
+
+    def prometheus(self):
+        """Counters in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for metric, key, help_text in (
+                ('examtool_stage_runs_total', 'runs', 'Completed runs of each stage'),
+                ('examtool_stage_seconds_total', 'seconds', 'Wall time spent in each stage'),
+                ('examtool_stage_rows_total', 'rows', 'Rows processed by each stage')):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, totals in sorted(snapshot.items()):
+                lines.append(f'{metric}{{stage="{name}"}} {totals[key]}')
+        return "\n".join(lines) + "\n"
+
+
+stage_totals = StageTotals()
+
+
+def current_run():
+    """The RunMetrics active in this context, or None."""
+    return _active_run.get()
+
+
+def start_run(track_memory=False):
+    """Start a new RunMetrics and make it active for the rest of this context (e.g. a rerun)."""
+    run = RunMetrics(track_memory)
+    _active_run.set(run)
+    return run
+
+
+@contextmanager
+def activate(run):
+    """Make run the active RunMetrics inside the block (e.g. in a worker thread)."""
+    token = _active_run.set(run)
+    try:
+        yield run
+    finally:
+        _active_run.reset(token)
+
+
+@contextmanager
+def stage(name, **labels):
+    """Time a stage; set record.rows inside the block to record a row count."""
+    run = _active_run.get()
+    record = StageRecord(name, labels)
+    parent = _active_stage.get()
+    track_memory = run is not None and run.track_memory and tracemalloc.is_tracing()
+    if track_memory:
+        record._start_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    token = _active_stage.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        _active_stage.reset(token)
+        if track_memory:
+            # reset_peak is process-wide, so nested stages pass their peak up to the parent
+            # (and stages running concurrently elsewhere reset each other's peaks)
+            peak = max(tracemalloc.get_traced_memory()[1], record._child_peak)
+            record.peak_bytes = max(peak - record._start_bytes, 0)
+            if parent is not None:
+                parent._child_peak = max(parent._child_peak, peak)
+        if run is not None:
+            run.add(record)
+        stage_totals.add(record)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record.as_dict()))
@@ -0,0 +1,141 @@
+"""
+Background report generation.
+
+Report requests run as jobs on a bounded thread pool so the Streamlit script thread
+never blocks on matplotlib/ReportLab. Jobs are deduplicated by a caller-supplied key
+(file content, view and report options), expose status and progress, and keep their
+result by job ID until evicted. With a shared cache backend, finished results are also
+stored there by key: another process submitting the same key gets the result without
+rendering, and a process that finds the key being rendered elsewhere waits for it.
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from shared_cache import cache_key, shared_cache
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class ReportJob:
+    """One report request: its status, progress (0..1), result bytes or error."""
+
+    def __init__(self, job_id, key):
+        self.id = job_id
+        self.key = key
+        self.status = QUEUED
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+    def set_progress(self, fraction):
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+
+
+class ReportJobQueue:
+    """Bounded worker pool of report jobs, deduplicated by key.
+
+    Job functions are called as fn(*args, progress=callback, **kwargs) and their return
+    value becomes the job result. A key with a queued, running or finished job returns
+    that job instead of starting another; failed jobs are retried on resubmission.
+    """
+
+    def __init__(self, max_workers=2, max_finished=32, shared=None):
+        self.max_finished = max_finished
+        self.shared = shared
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-job')
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        with self._lock:
+            job = self._jobs.get(self._by_key.get(key))
+            if job is not None and job.status != FAILED:
+                return job
+            if job is not None:
+                del self._jobs[job.id]
+            job = ReportJob(uuid.uuid4().hex[:12], key)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _shared_result(self, key):
+        try:
+            return self.shared.get(cache_key('report', key))
+        except Exception:
+            return None
+
+    def _compute(self, job, fn, args, kwargs):
+        if self.shared is None:
+            return fn(*args, progress=job.set_progress, **kwargs)
+        name = cache_key('report', job.key)
+        try:
+            lock = self.shared.lock(name)
+        except Exception:
+            # An unreachable shared cache only loses the sharing
+            return fn(*args, progress=job.set_progress, **kwargs)
+        # Only one process renders a key; the others find its result once the lock is free
+        with lock:
+            result = self._shared_result(job.key)
+            if result is None:
+                result = fn(*args, progress=job.set_progress, **kwargs)
+                try:
+                    self.shared.set(name, result)
+                except Exception:
+                    pass
+        return result
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        try:
+            job.result = self._compute(job, fn, args, kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+        job.finished_at = time.time()
+        self._evict()
+
+    def _evict(self):
+        # Only finished jobs are dropped, oldest first, so results stay bounded
+        with self._lock:
+            finished = sorted((j for j in self._jobs.values() if j.done), key=lambda j: j.finished_at)
+            for job in finished[:max(len(finished) - self.max_finished, 0)]:
+                del self._jobs[job.id]
+                if self._by_key.get(job.key) == job.id:
+                    del self._by_key[job.key]
+
+    def get(self, job_id):
+        """Return the job with this ID, or None if unknown or evicted."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find(self, key):
+        """Return the current job for this key, or None."""
+        with self._lock:
+            return self._jobs.get(self._by_key.get(key))
+
+    def stats(self):
+        """Number of tracked jobs per status."""
+        with self._lock:
+            counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+
+# Module-level queue so jobs and results survive Streamlit script reruns
+report_jobs = ReportJobQueue(shared=shared_cache)
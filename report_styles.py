@@ -0,0 +1,94 @@
+"""
+ReportLab styles for the PDF report.
+
+ReportLab is only imported the first time a report is built, and the stylesheet,
+paragraph styles and table styles are created once per process instead of per report.
+"""
+from functools import lru_cache
+
+HEADER_BLUE = '#1e3a8a'
+GRID_GREY = '#cbd5e1'
+
+
+@lru_cache(maxsize=None)
+def paragraph_styles():
+    """getSampleStyleSheet() plus the report's own paragraph styles, by name."""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    styles = getSampleStyleSheet()
+    return {
+        'heading': styles['Heading2'],
+        'title': ParagraphStyle('Title', parent=styles['Heading1'],
+            fontSize=24, textColor=colors.HexColor(HEADER_BLUE), alignment=TA_CENTER,
+            spaceAfter=5, fontName='Helvetica-Bold'),
+        'report_type': ParagraphStyle('ReportType', parent=styles['Heading2'],
+            fontSize=16, textColor=colors.HexColor('#334155'), alignment=TA_CENTER,
+            spaceAfter=10, fontName='Helvetica-Bold'),
+        'subtitle': ParagraphStyle('Subtitle', parent=styles['Normal'],
+            fontSize=11, textColor=colors.HexColor('#64748b'), alignment=TA_CENTER,
+            spaceAfter=20),
+        'contents': ParagraphStyle('Contents', parent=styles['Normal'],
+            fontSize=11, textColor=colors.HexColor('#1e293b'))
+    }
+
+
+@lru_cache(maxsize=None)
+def table_styles():
+    """TableStyles of the info, distribution, subject breakdown, contents and student tables, by name."""
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+
+    return {
+        'info': TableStyle([
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#1e293b')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ]),
+        'distribution': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(HEADER_BLUE)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor(GRID_GREY)),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f1f5f9')]),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            # Style for totals row
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor(HEADER_BLUE)),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ]),
+        'breakdown': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(HEADER_BLUE)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor(GRID_GREY)),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f1f5f9')])
+        ]),
+        'contents': TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('LINEBELOW', (0, 0), (-1, -1), 0.5, colors.HexColor(GRID_GREY)),
+            ('TOPPADDING', (0, 0), (-1, -1), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ]),
+        'students': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(HEADER_BLUE)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (1, 0), (1, -1), 'LEFT'),  # Align Registration Number column to left
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor(GRID_GREY)),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')])
+        ])
+    }
@@ -0,0 +1,239 @@
+"""
+Persistent SQLite store of parsed mark sheet results across semesters.
+
+Each parsed sheet is stored once per (file content hash, sheet name), so re-uploading
+the same file is a no-op. Student results are indexed by registration number and
+sheets by exam and subject, so history and distribution queries do not need the
+original Excel files.
+
+A revised file with the same course, exam and subject supersedes the earlier upload:
+queries only see the latest version, and the grades that changed are kept as an audit
+trail in grade_changes.
+"""
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from grades import GRADE_ORDER
+from revisions import CHANGE_COLUMNS, SheetRevision, diff_results, is_identified, sheet_key
+
+DEFAULT_DB_PATH = os.getenv('EXAMTOOL_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheets (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    course TEXT NOT NULL,
+    exam TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    students INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL,
+    superseded_by INTEGER REFERENCES sheets (id),
+    UNIQUE (content_hash, sheet_name)
+);
+CREATE TABLE IF NOT EXISTS results (
+    sheet_id INTEGER NOT NULL REFERENCES sheets (id) ON DELETE CASCADE,
+    student_no TEXT NOT NULL,
+    registration_number TEXT NOT NULL,
+    grade TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS grade_changes (
+    sheet_id INTEGER NOT NULL REFERENCES sheets (id) ON DELETE CASCADE,
+    registration_number TEXT NOT NULL,
+    old_grade TEXT,
+    new_grade TEXT,
+    change TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_registration ON results (registration_number);
+CREATE INDEX IF NOT EXISTS idx_results_sheet ON results (sheet_id);
+CREATE INDEX IF NOT EXISTS idx_sheets_exam ON sheets (exam);
+CREATE INDEX IF NOT EXISTS idx_sheets_subject ON sheets (subject);
+CREATE INDEX IF NOT EXISTS idx_sheets_key ON sheets (course, exam, subject);
+CREATE INDEX IF NOT EXISTS idx_grade_changes_sheet ON grade_changes (sheet_id);
+"""
+
+# Columns added after the first release, for databases created before them
+MIGRATIONS = {
+    'superseded_by': "ALTER TABLE sheets ADD COLUMN superseded_by INTEGER REFERENCES sheets (id)"
+}
+
+
+class ResultsStore:
+    """Embedded SQLite results store. Safe to use from several threads and processes."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._initialised = False
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per call keeps Streamlit sessions and batch workers independent
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA foreign_keys = ON")
+            if not self._initialised:
+                conn.execute("PRAGMA journal_mode = WAL")
+                self._migrate(conn)
+                conn.executescript(SCHEMA)
+                self._initialised = True
+            with conn:
+                yield conn
+
+    @staticmethod
+    def _migrate(conn):
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sheets)")}
+        if not columns:
+            return
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(statement)
+
+    def ingest(self, content_hash, sheets):
+        """Store parsed sheets [(sheet_name, df_students, metadata), ...] for one file.
+
+        Sheets already stored for this content hash are skipped. A sheet whose course,
+        exam and subject are already stored from another file supersedes that upload,
+        and its grade changes against it are recorded. Returns the number of newly
+        stored sheets.
+        """
+        added = 0
+        ingested_at = datetime.now().isoformat(timespec='seconds')
+        with self._connect() as conn:
+            for sheet_name, df, metadata in sheets:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO sheets "
+                    "(content_hash, sheet_name, course, exam, subject, students, ingested_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (content_hash, sheet_name, metadata['course'], metadata['exam'],
+                     metadata['subject'], len(df), ingested_at))
+                if cursor.rowcount == 0:
+                    continue
+                conn.executemany(
+                    "INSERT INTO results (sheet_id, student_no, registration_number, grade) "
+                    "VALUES (?, ?, ?, ?)",
+                    zip(repeat(cursor.lastrowid), df['#'].astype(str),
+                        df['Registration Number'].astype(str), df['Grade'].astype(str)))
+                self._supersede(conn, cursor.lastrowid, content_hash, df, metadata)
+                added += 1
+        return added
+
+    @staticmethod
+    def _supersede(conn, sheet_id, content_hash, df, metadata):
+        """Mark earlier uploads of this sheet's subject as superseded and record the grade changes."""
+        if not is_identified(metadata):
+            # Sheets without course/exam/subject are never taken for revisions of each other
+            return
+        key = sheet_key(metadata)
+        previous = conn.execute(
+            "SELECT id FROM sheets WHERE course = ? AND exam = ? AND subject = ? "
+            "AND superseded_by IS NULL AND content_hash != ? ORDER BY id DESC LIMIT 1",
+            key + (content_hash,)).fetchone()
+        if previous is None:
+            return
+        previous_df = pd.read_sql_query(
+            'SELECT registration_number AS "Registration Number", grade AS Grade FROM results WHERE sheet_id = ?',
+            conn, params=previous)
+        changes = diff_results(previous_df, df)
+        conn.executemany(
+            "INSERT INTO grade_changes (sheet_id, registration_number, old_grade, new_grade, change) "
+            "VALUES (?, ?, ?, ?, ?)",
+            zip(repeat(sheet_id), *(changes[column] for column in CHANGE_COLUMNS)))
+        conn.execute(
+            "UPDATE sheets SET superseded_by = ? WHERE course = ? AND exam = ? AND subject = ? "
+            "AND superseded_by IS NULL AND content_hash != ?",
+            (sheet_id,) + key + (content_hash,))
+
+    def revisions(self, content_hash):
+        """SheetRevisions of a stored file's sheets that superseded an earlier upload."""
+        revisions = []
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT s.id, s.sheet_name, s.course, s.exam, s.subject, p.id, p.students, p.ingested_at "
+                "FROM sheets s JOIN sheets p ON p.superseded_by = s.id "
+                "WHERE s.content_hash = ? ORDER BY s.id, p.id DESC", (content_hash,)).fetchall()
+            seen = set()
+            for sheet_id, sheet_name, course, exam, subject, previous_id, previous_students, uploaded in rows:
+                if sheet_id in seen:
+                    continue
+                seen.add(sheet_id)
+                changes = pd.read_sql_query(
+                    'SELECT registration_number AS "Registration Number", old_grade AS "Old Grade", '
+                    'new_grade AS "New Grade", change AS Change FROM grade_changes WHERE sheet_id = ?',
+                    conn, params=(sheet_id,))
+                counts = dict(conn.execute(
+                    "SELECT grade, COUNT(*) FROM results WHERE sheet_id = ? GROUP BY grade", (previous_id,)))
+                previous_counts = np.array([counts.get(grade, 0) for grade in GRADE_ORDER], dtype=np.int64)
+                revisions.append(SheetRevision(sheet_name, (course, exam, subject), uploaded, changes,
+                                               previous_counts, previous_students))
+        return revisions
+
+    def change_log(self, subject=None):
+        """Audit trail of grade changes between uploads, newest first."""
+        query = (
+            "SELECT s.course AS Course, s.exam AS Exam, s.subject AS Subject, "
+            'g.registration_number AS "Registration Number", g.old_grade AS "Old Grade", '
+            'g.new_grade AS "New Grade", g.change AS Change, s.ingested_at AS Uploaded '
+            "FROM grade_changes g JOIN sheets s ON s.id = g.sheet_id")
+        params = ()
+        if subject is not None:
+            query += " WHERE s.subject = ?"
+            params = (subject,)
+        with self._connect() as conn:
+            return pd.read_sql_query(query + " ORDER BY s.ingested_at DESC, s.id DESC, g.rowid",
+                                     conn, params=params)
+
+    def contains(self, content_hash):
+        """Return True if any sheet of the file with this content hash is stored."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM sheets WHERE content_hash = ? LIMIT 1",
+                               (content_hash,)).fetchone()
+        return row is not None
+
+    def student_history(self, registration_number):
+        """Every stored grade for one student, oldest ingestion first."""
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                "SELECT s.course AS Course, s.exam AS Exam, s.subject AS Subject, r.grade AS Grade "
+                "FROM results r JOIN sheets s ON s.id = r.sheet_id "
+                "WHERE r.registration_number = ? AND s.superseded_by IS NULL ORDER BY s.ingested_at, s.id",
+                conn, params=(registration_number.strip(),))
+
+    def subject_distribution(self, subject):
+        """Grade counts for one subject with one row per exam (columns are grades)."""
+        with self._connect() as conn:
+            counts = pd.read_sql_query(
+                "SELECT s.exam AS Exam, r.grade AS Grade, COUNT(*) AS Count "
+                "FROM sheets s JOIN results r ON r.sheet_id = s.id "
+                "WHERE s.subject = ? AND s.superseded_by IS NULL GROUP BY s.exam, r.grade",
+                conn, params=(subject,))
+        if counts.empty:
+            return pd.DataFrame()
+        # Grade columns in GRADE_ORDER, as in every other distribution
+        return counts.pivot(index='Exam', columns='Grade', values='Count') \
+            .reindex(columns=GRADE_ORDER, fill_value=0).fillna(0).astype(int)
+
+    def grade_count_rows(self, after_id=0):
+        """Grade counts of current sheets stored after sheet id after_id.
+
+        Returns (sheet_id, course, exam, subject, grade, count) rows ordered by sheet id,
+        so analytics can pick up new uploads without rereading older sheets.
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT s.id, s.course, s.exam, s.subject, r.grade, COUNT(*) "
+                "FROM sheets s JOIN results r ON r.sheet_id = s.id "
+                "WHERE s.id > ? AND s.superseded_by IS NULL GROUP BY s.id, r.grade ORDER BY s.id",
+                (after_id,)).fetchall()
+
+    def subjects(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT subject FROM sheets ORDER BY subject")]
+
+
+# Default store used by the app and batch mode
+results_store = ResultsStore()
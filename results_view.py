@@ -0,0 +1,174 @@
+"""
+Paginated, filterable student results.
+
+StudentResultsIndex is built once per parsed student table: the rows of every grade,
+every sort order the view offers and the registration numbers in sorted order (so a
+prefix search is a binary search) are precomputed, and substring searches go through
+an n-gram index built on the first such search. Changing a filter only combines
+precomputed row arrays with NumPy, and the app sends just the visible page to the
+browser instead of every row.
+"""
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+from grades import GRADE_ORDER, as_grades
+from marksheet_cache import LRUCache
+
+SORT_ORDERS = {
+    'sheet': "Sheet order (#)",
+    'registration': "Registration Number (A-Z)",
+    'registration_desc': "Registration Number (Z-A)",
+    'grade_desc': "Grade (highest first)",
+    'grade': "Grade (lowest first)"
+}
+PREFIX = 'prefix'
+CONTAINS = 'contains'
+PAGE_SIZES = (25, 50, 100, 250)
+NGRAM = 3
+
+
+def registration_key(values):
+    """Registration numbers as upper-case, stripped search keys."""
+    return pd.Series(values, dtype=object).astype(str).str.strip().str.upper()
+
+
+class StudentResultsIndex:
+    """Precomputed grade, search and sort indexes over one student results table."""
+
+    def __init__(self, df):
+        self.df = df
+        n = len(df)
+        position = np.arange(n)
+        keys = registration_key(df['Registration Number']).to_numpy(dtype=str)
+        grades = as_grades(df['Grade'])
+        codes = grades.cat.codes.to_numpy().astype(np.int64)
+        # Values off the grade scale (N/A, MC, ...) and missing grades sort last either way
+        off_scale = (codes < 0) | (codes >= len(GRADE_ORDER))
+
+        by_key = np.argsort(keys, kind='stable')
+        self._keys = keys
+        self._sorted_keys = keys[by_key]
+        self._by_key = by_key
+        self._orders = {
+            'sheet': position,
+            'registration': by_key,
+            'registration_desc': by_key[::-1],
+            # Grade ties keep sheet order
+            'grade_desc': np.lexsort((position, -codes, off_scale)),
+            'grade': np.lexsort((position, codes, off_scale))
+        }
+
+        # Rows of every grade: one stable argsort, split at the code boundaries
+        by_grade = np.argsort(codes, kind='stable')
+        present = np.unique(codes[codes >= 0])
+        bounds = np.searchsorted(codes[by_grade], np.append(present, present[-1] + 1 if len(present) else 0))
+        categories = grades.cat.categories
+        self.grades = [str(categories[code]) for code in present]
+        self._grade_rows = {str(categories[code]): by_grade[bounds[i]:bounds[i + 1]]
+                            for i, code in enumerate(present)}
+
+        self._ngrams = None
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def _ngram_index(self):
+        """(n-gram codes, rows) of every registration-number substring of up to NGRAM characters.
+
+        Keys are viewed as a matrix of code points and each n-gram packed into one int64
+        (21 bits per character), so the index is two arrays sorted by n-gram.
+        """
+        with self._lock:
+            if self._ngrams is None:
+                n = len(self._keys)
+                width = self._keys.dtype.itemsize // 4
+                chars = self._keys.view(np.uint32).reshape(n, width).astype(np.int64)
+                rows = np.arange(n)
+                grams, gram_rows = [], []
+                for size in range(1, NGRAM + 1):
+                    for start in range(width - size + 1):
+                        window = chars[:, start:start + size]
+                        # Padding after the end of a key is code point 0
+                        valid = window[:, -1] != 0
+                        grams.append(_pack(window[valid]))
+                        gram_rows.append(rows[valid])
+                grams = np.concatenate(grams) if grams else np.array([], dtype=np.int64)
+                gram_rows = np.concatenate(gram_rows) if gram_rows else np.array([], dtype=np.int64)
+                order = np.lexsort((gram_rows, grams))
+                grams, gram_rows = grams[order], gram_rows[order]
+                # A row containing an n-gram twice is listed once
+                first = np.ones(len(grams), dtype=bool)
+                first[1:] = (grams[1:] != grams[:-1]) | (gram_rows[1:] != gram_rows[:-1])
+                self._ngrams = grams[first], gram_rows[first]
+            return self._ngrams
+
+    def _ngram_rows(self, gram):
+        grams, rows = self._ngram_index()
+        code = _pack(np.array([[ord(char) for char in gram]], dtype=np.int64))[0]
+        return rows[np.searchsorted(grams, code, side='left'):np.searchsorted(grams, code, side='right')]
+
+    def search(self, text, mode=PREFIX):
+        """Rows whose registration number starts with (or contains) text, case-insensitively."""
+        text = text.strip().upper()
+        if not text:
+            return np.arange(len(self))
+        if mode == PREFIX:
+            lo = np.searchsorted(self._sorted_keys, text, side='left')
+            hi = np.searchsorted(self._sorted_keys, text + '\U0010ffff', side='left')
+            return np.sort(self._by_key[lo:hi])
+        if len(text) <= NGRAM:
+            return self._ngram_rows(text)
+        # The rarest n-gram of the query gives the candidates; only those are checked
+        candidates = min((self._ngram_rows(text[i:i + NGRAM]) for i in range(len(text) - NGRAM + 1)), key=len)
+        return np.array([row for row in candidates if text in self._keys[row]], dtype=np.int64)
+
+    def rows(self, grades=None, search='', mode=PREFIX, sort='sheet'):
+        """Positions of the matching rows in display order.
+
+        grades limits the rows to those grades (None or empty keeps every grade).
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        if grades:
+            for grade in grades:
+                mask[self._grade_rows.get(grade, [])] = True
+        else:
+            mask[:] = True
+        if search.strip():
+            matched = np.zeros(len(self), dtype=bool)
+            matched[self.search(search, mode)] = True
+            mask &= matched
+        order = self._orders[sort]
+        return order[mask[order]]
+
+    def page(self, rows, page, page_size):
+        """The student rows of one page (1-based) of a rows() result."""
+        start = (page - 1) * page_size
+        return self.df.iloc[rows[start:start + page_size]]
+
+
+def _pack(window):
+    """One int64 per row of a (rows, size <= 3) code point matrix."""
+    packed = np.zeros(len(window), dtype=np.int64)
+    for column in range(window.shape[1]):
+        packed = (packed << 21) | window[:, column]
+    return packed
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+
+# Indexes survive Streamlit reruns; keyed by the parsed results of the viewed table
+results_indexes = LRUCache(max_entries=8)
+
+
+def results_index(df, key):
+    """Cached StudentResultsIndex for a student table identified by key."""
+    index = results_indexes.get(key)
+    if index is None:
+        index = StudentResultsIndex(df)
+        results_indexes.put(key, index)
+    return index
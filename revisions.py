@@ -0,0 +1,123 @@
+"""
+Incremental re-uploads: what changed between two parses of the same mark sheet.
+
+A revised sheet (same course, exam and subject) is compared with the previously stored
+parse by registration number. A few corrected grades give a short change list, the
+grade counts are updated from the changed rows only, and outputs are keyed by the
+parsed results rather than the file bytes, so charts with unchanged counts and reports
+of unchanged subjects are reused.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from grades import distribution_frame, grade_counts
+
+CHANGED = 'changed'
+ADDED = 'added'
+REMOVED = 'removed'
+
+CHANGE_COLUMNS = ['Registration Number', 'Old Grade', 'New Grade', 'Change']
+
+# Placeholders for sheets without Course/Exam/Subject cells (e.g. DataGrid exports)
+UNKNOWN_METADATA = {'course': "Unknown Course", 'exam': "Unknown Exam", 'subject': "Unknown Subject"}
+
+
+def sheet_key(metadata):
+    """Identity of a mark sheet across re-uploads."""
+    return metadata['course'], metadata['exam'], metadata['subject']
+
+
+def is_identified(metadata):
+    """False when course, exam or subject is a placeholder, so unrelated sheets could share the key."""
+    return all(metadata[key] != value for key, value in UNKNOWN_METADATA.items())
+
+
+def results_fingerprint(df):
+    """Hash of a parsed student table's rows, independent of the file bytes it came from."""
+    rows = pd.util.hash_pandas_object(df.astype(str), index=False)
+    return hashlib.sha256(rows.to_numpy().tobytes()).hexdigest()
+
+
+def combined_fingerprint(fingerprints):
+    """Fingerprint of several tables together from their results_fingerprints."""
+    return hashlib.sha256(''.join(fingerprints).encode('ascii')).hexdigest()
+
+
+def _grades_by_student(df):
+    frame = pd.DataFrame({
+        'Registration Number': df['Registration Number'].astype(str).str.strip().to_numpy(),
+        'Grade': df['Grade'].astype(str).to_numpy()
+    })
+    # A student listed twice keeps the later row, as a correction would
+    return frame.drop_duplicates('Registration Number', keep='last')
+
+
+def diff_results(previous, current):
+    """Students whose grade differs between two parses, matched by registration number.
+
+    previous and current need 'Registration Number' and 'Grade' columns. Returns a
+    CHANGE_COLUMNS frame; Change is 'changed', 'added' (only in current) or 'removed'
+    (only in previous), and the missing side's grade is None.
+    """
+    merged = _grades_by_student(previous).merge(_grades_by_student(current), on='Registration Number',
+                                                how='outer', suffixes=('_old', '_new'), indicator=True,
+                                                sort=False)
+    merged = merged[merged['Grade_old'] != merged['Grade_new']]
+    side = merged['_merge'].astype(str)
+    return pd.DataFrame({
+        'Registration Number': merged['Registration Number'].to_numpy(),
+        'Old Grade': merged['Grade_old'].astype(object).where(merged['Grade_old'].notna(), None).to_numpy(),
+        'New Grade': merged['Grade_new'].astype(object).where(merged['Grade_new'].notna(), None).to_numpy(),
+        'Change': np.select([side == 'left_only', side == 'right_only'], [REMOVED, ADDED], CHANGED)
+    }, columns=CHANGE_COLUMNS)
+
+
+def update_counts(counts, changes):
+    """Grade counts after applying changes, without recounting the whole sheet."""
+    return np.asarray(counts, dtype=np.int64) - grade_counts(changes['Old Grade'].dropna()) \
+        + grade_counts(changes['New Grade'].dropna())
+
+
+class SheetRevision:
+    """A stored sheet that replaced an earlier upload of the same course, exam and subject."""
+
+    __slots__ = ('sheet_name', 'key', 'previous_uploaded', 'changes', 'previous_counts', 'previous_students')
+
+    def __init__(self, sheet_name, key, previous_uploaded, changes, previous_counts, previous_students):
+        self.sheet_name = sheet_name
+        self.key = key
+        self.previous_uploaded = previous_uploaded
+        self.changes = changes
+        self.previous_counts = np.asarray(previous_counts, dtype=np.int64)
+        self.previous_students = previous_students
+
+    @property
+    def counts(self):
+        return update_counts(self.previous_counts, self.changes)
+
+    @property
+    def students(self):
+        change = self.changes['Change']
+        return self.previous_students + int((change == ADDED).sum()) - int((change == REMOVED).sum())
+
+    def summary(self):
+        """Number of changed, added and removed students."""
+        change = self.changes['Change']
+        return {kind: int((change == kind).sum()) for kind in (CHANGED, ADDED, REMOVED)}
+
+    def counts_changed(self):
+        """False when only who has which grade changed, so the distribution and charts are unchanged."""
+        return not np.array_equal(self.counts, self.previous_counts)
+
+    def distribution(self):
+        """Grade distribution of the revised sheet, updated incrementally from the previous one."""
+        return distribution_frame(self.counts, self.students)
+
+    def distribution_delta(self):
+        """Grade / Previous / Now / Change table for grades whose count changed."""
+        delta = pd.DataFrame({'Grade': self.distribution()['Grade'], 'Previous': self.previous_counts,
+                              'Now': self.counts})
+        delta['Change'] = delta['Now'] - delta['Previous']
+        return delta[delta['Change'] != 0].reset_index(drop=True)
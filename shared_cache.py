@@ -0,0 +1,278 @@
+"""
+Shared cache backends, so several app or API processes reuse each other's work.
+
+The in-memory caches (parsed workbooks, chart images, finished reports) stay per
+process; a shared backend sits behind them as a second level. Set EXAMTOOL_CACHE to
+enable one:
+
+- a directory (or disk:/path): DiskCache, safe across processes on one host or on a
+  shared volume. Entries are written atomically (temporary file + os.replace), expire
+  after a TTL, and the least recently used entries are evicted above a size limit.
+- redis://host:port/db (or rediss://, unix://): RedisCache over redis-py, which is
+  imported only then. Any client with Redis get / set(ex=) / delete works, so
+  Redis-compatible servers (Valkey, KeyDB, ...) can be used too.
+
+EXAMTOOL_CACHE_MAX_MB bounds the disk cache (default 512) and EXAMTOOL_CACHE_TTL sets
+the entry lifetime in seconds (default 7 days, 0 for none). Values are bytes; callers
+pickle anything else, so only point the cache at storage this app alone writes to.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext
+from threading import Lock
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 3600
+LOCK_TIMEOUT = 600
+# Bumped when the layout of cached values changes, so old entries are never read
+CACHE_FORMAT = 1
+
+ENTRY_SUFFIX = '.entry'
+HEADER = struct.Struct('<d')
+LOCK_STRIPES = 3
+
+
+def cache_key(namespace, key):
+    """String key for a shared backend; non-string keys (tuples) are hashed."""
+    if not isinstance(key, str):
+        key = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+    return f"v{CACHE_FORMAT}:{namespace}:{key}"
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on a lock file, held across processes (and threads) until exit."""
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about 10 seconds; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class DiskCache:
+    """Size-bounded, expiring cache of bytes in a directory, shared by every process using it.
+
+    Each entry is one file named by the key's hash, holding its expiry time and value.
+    Readers never see partial writes, and hits refresh the file's mtime so eviction
+    drops the least recently used entries first.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, default_ttl=DEFAULT_TTL):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        os.makedirs(os.path.join(self.directory, 'locks'), exist_ok=True)
+        self._written = 0
+        self._written_lock = Lock()
+
+    def __repr__(self):
+        return f"DiskCache({self.directory!r})"
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """The value stored under key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                (expires,) = HEADER.unpack(f.read(HEADER.size))
+                if expires and expires < time.time():
+                    value = None
+                else:
+                    value = f.read()
+        except (FileNotFoundError, struct.error):
+            return None
+        if value is None:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value, ex=None):
+        """Store bytes under key for ex seconds (default_ttl when None, no expiry when 0)."""
+        ttl = self.default_ttl if ex is None else ex
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(time.time() + ttl if ttl else 0.0))
+                f.write(value)
+            os.replace(temp_path, path)
+        except BaseException:
+            self._remove(temp_path)
+            raise
+        with self._written_lock:
+            self._written += len(value)
+            due = self._written > self.max_bytes // 8
+            if due:
+                self._written = 0
+        if due:
+            self.evict()
+
+    def delete(self, *keys):
+        for key in keys:
+            self._remove(self._path(key))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        """(path, size, mtime) of every entry file."""
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir() or shard.name == 'locks':
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self):
+        """Drop expired entries and stale temporary files, then the least recently used entries
+        until the cache is within max_bytes. Returns the number of files removed."""
+        removed = 0
+        now = time.time()
+        with file_lock(os.path.join(self.directory, 'locks', 'evict.lock')):
+            kept = []
+            for path, size, mtime in self._entries():
+                if path.endswith('.tmp'):
+                    # Left behind by a writer that died before renaming
+                    if mtime < now - LOCK_TIMEOUT:
+                        self._remove(path)
+                        removed += 1
+                    continue
+                try:
+                    with open(path, 'rb') as f:
+                        (expires,) = HEADER.unpack(f.read(HEADER.size))
+                except (OSError, struct.error):
+                    continue
+                if expires and expires < now:
+                    self._remove(path)
+                    removed += 1
+                else:
+                    kept.append((mtime, size, path))
+            total = sum(size for _, size, _ in kept)
+            for _, size, path in sorted(kept):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+        return removed
+
+    def lock(self, key):
+        """Cross-process lock for key, so only one process computes a missing value.
+
+        Lock files are striped by hash prefix, so their number stays bounded.
+        """
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return file_lock(os.path.join(self.directory, 'locks', digest[:LOCK_STRIPES] + '.lock'))
+
+    def clear(self):
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    def stats(self):
+        entries = [(size, path) for path, size, _ in self._entries() if path.endswith(ENTRY_SUFFIX)]
+        return {
+            'backend': 'disk',
+            'entries': len(entries),
+            'bytes': sum(size for size, _ in entries),
+            'max_bytes': self.max_bytes
+        }
+
+
+class RedisCache:
+    """Cache of bytes in Redis or any server speaking its protocol.
+
+    Size bounds come from the server's maxmemory and eviction policy (e.g. allkeys-lru).
+    """
+
+    def __init__(self, client, prefix='examtool:', default_ttl=DEFAULT_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def __repr__(self):
+        return f"RedisCache({self.client!r})"
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ex=None):
+        ttl = self.default_ttl if ex is None else ex
+        self.client.set(self.prefix + key, value, ex=int(ttl) or None)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def lock(self, key):
+        # redis-py locks expire, so a crashed worker cannot hold one forever
+        if hasattr(self.client, 'lock'):
+            return self.client.lock(f"{self.prefix}lock:{key}", timeout=LOCK_TIMEOUT)
+        return nullcontext()
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        return {'backend': 'redis'}
+
+
+def cache_from_url(url, max_bytes=DEFAULT_MAX_BYTES, default_ttl=DEFAULT_TTL):
+    """Backend for a cache URL or directory; None when url is empty."""
+    if not url:
+        return None
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCache.from_url(url, default_ttl=default_ttl)
+    if url.startswith('disk:'):
+        url = url[len('disk:'):]
+    return DiskCache(url, max_bytes=max_bytes, default_ttl=default_ttl)
+
+
+# Module-level backend shared by every cache in this process; None unless EXAMTOOL_CACHE is set
+shared_cache = cache_from_url(os.getenv('EXAMTOOL_CACHE'),
+                              max_bytes=int(float(os.getenv('EXAMTOOL_CACHE_MAX_MB', '512')) * 1024 * 1024),
+                              default_ttl=int(os.getenv('EXAMTOOL_CACHE_TTL', str(DEFAULT_TTL))))
@@ -0,0 +1,59 @@
+import pandas as pd
+
+from layouts import CACHED, DETECTED, metadata_from_cells, resolve_layout, template_fingerprint
+from marksheet_cache import LRUCache
+
+WIDTH = 14
+
+
+def marksheet(metadata_rows, registration_label=True, registration_column=1):
+    """Header block of a small mark sheet: metadata rows, then a '#' / ... / 'Grade' table."""
+    rows = [row + [None] * (WIDTH - len(row)) for row in metadata_rows]
+    header = ['#'] + [None] * (WIDTH - 2) + ['Grade']
+    if registration_label:
+        header[registration_column] = 'Registration Number'
+    rows.append(header)
+    for i in range(3):
+        row = [i + 1] + [None] * (WIDTH - 2) + ['A']
+        row[registration_column] = f"BSc/2024-18A/WE-00{i}"
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def resolve_both(first, second):
+    cache = LRUCache(8)
+    resolve_layout(first, cache)
+    return resolve_layout(second, cache)
+
+
+def test_same_template_is_cached():
+    first = marksheet([['Course', 'BSc'], ['Exam', 'E1'], ['Subject', 'HRM']])
+    second = marksheet([['Course', 'MSc'], ['Exam', 'E2'], ['Subject', 'Tax']])
+    layout, how = resolve_both(first, second)
+    assert how == CACHED
+    assert metadata_from_cells(second, layout) == {'course': 'MSc', 'exam': 'E2', 'subject': 'Tax'}
+
+
+def test_separator_column_is_another_template():
+    first = marksheet([['Course', 'BSc'], ['Exam', 'E1'], ['Subject', 'HRM']])
+    second = marksheet([['Course', ':', 'MSc'], ['Exam', ':', 'E2'], ['Subject', ':', 'Tax']])
+    assert template_fingerprint(first) != template_fingerprint(second)
+    layout, how = resolve_both(first, second)
+    assert how == DETECTED
+    assert metadata_from_cells(second, layout) == {'course': 'MSc', 'exam': 'E2', 'subject': 'Tax'}
+
+
+def test_label_with_colon_is_another_template():
+    first = marksheet([['Course :', 'BSc'], ['Exam :', 'E1'], ['Subject :', 'HRM']])
+    second = marksheet([['Course', ':', 'MSc'], ['Exam', ':', 'E2'], ['Subject', ':', 'Tax']])
+    layout, how = resolve_both(first, second)
+    assert how == DETECTED
+    assert metadata_from_cells(second, layout) == {'course': 'MSc', 'exam': 'E2', 'subject': 'Tax'}
+
+
+def test_unlabelled_registration_column_position():
+    first = marksheet([], registration_label=False, registration_column=1)
+    second = marksheet([], registration_label=False, registration_column=2)
+    layout, how = resolve_both(first, second)
+    assert how == DETECTED
+    assert layout.registration_column == 2
@@ -0,0 +1,101 @@
+"""Theme colours and the app's CSS, built once per theme and reused across Streamlit reruns."""
+from functools import lru_cache
+
+THEME_COLORS = {
+    'dark': {
+        "primary_bg": "#0f172a", "secondary_bg": "#1e293b", "card_bg": "#1e293b",
+        "accent": "#fbbf24", "accent_hover": "#f59e0b", "text_primary": "#f8fafc",
+        "text_secondary": "#94a3b8", "border": "#334155"
+    },
+    'light': {
+        "primary_bg": "#f1f5f9", "secondary_bg": "#ffffff", "card_bg": "#ffffff",
+        "accent": "#b45309", "accent_hover": "#78350f", "text_primary": "#1e293b",
+        "text_secondary": "#64748b", "border": "#cbd5e1"
+    }
+}
+
+
+@lru_cache(maxsize=None)
+def theme_css(dark_mode):
+    """Return the <style> block for the dark or light theme."""
+    theme_colors = THEME_COLORS['dark' if dark_mode else 'light']
+    return f"""
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Outfit:wght@400;500;600;700&display=swap');
+    
+    * {{ font-family: 'Inter', sans-serif; }}
+    
+    .stApp {{
+        background-color: {theme_colors['primary_bg']};
+    }}
+    
+    h1, h2, h3, h4 {{
+        font-family: 'Outfit', sans-serif;
+        color: {theme_colors['text_primary']} !important;
+    }}
+    
+    [data-testid="stMarkdownContainer"] h1,
+    [data-testid="stMarkdownContainer"] h2,
+    [data-testid="stMarkdownContainer"] h3,
+    [data-testid="stMarkdownContainer"] p,
+    label, span {{
+        color: {theme_colors['text_primary']} !important;
+    }}
+    
+    [data-testid="stVerticalBlockBorderWrapper"] {{
+        background-color: {theme_colors['card_bg']};
+        border: 1px solid {theme_colors['border']};
+        border-radius: 12px;
+        padding: 1.5rem;
+    }}
+    
+    [data-testid="stSidebar"] {{
+        background-color: {theme_colors['secondary_bg']};
+        border-right: 1px solid {theme_colors['border']};
+    }}
+    
+    .stButton > button {{
+        background-color: {theme_colors['accent']} !important;
+        color: white !important;
+        border: none !important;
+        border-radius: 6px !important;
+        font-weight: 600 !important;
+        padding: 0.5rem 1.5rem !important;
+        transition: all 0.2s;
+    }}
+    
+    .stButton > button:hover {{
+        background-color: {theme_colors['accent_hover']} !important;
+        transform: translateY(-2px);
+        box-shadow: 0 4px 12px rgba(180, 83, 9, 0.3);
+    }}
+    
+    div[data-testid="stMetricValue"] {{
+        font-size: 1.8rem !important;
+        font-weight: 700;
+        color: {theme_colors['accent']} !important;
+    }}
+    
+    div[data-testid="stMetricLabel"] {{
+        color: {theme_colors['text_secondary']} !important;
+        font-weight: 500;
+    }}
+    
+    .header-title {{
+        color: {theme_colors['accent']} !important;
+        font-size: 2rem !important;
+        font-weight: 700;
+        margin-bottom: 0.5rem;
+    }}
+    
+    .info-badge {{
+        background: linear-gradient(135deg, {theme_colors['accent']} 0%, {theme_colors['accent_hover']} 100%);
+        color: white;
+        padding: 0.5rem 1rem;
+        border-radius: 8px;
+        font-weight: 600;
+        display: inline-block;
+        margin: 0.25rem;
+    }}
+</style>
+    """
@@ -0,0 +1,180 @@
+"""
+Cross-file student transcripts.
+
+Parsed subject sheets are folded into a hash index keyed by registration number in a
+single pass. Each student keeps their own grade entries plus running grade-point
+totals, so memory grows with the number of distinct students and their results.
+
+Usage:
+    python transcripts.py "marksheets/" -o transcripts.xlsx
+    python transcripts.py "marksheets/" --student "BSc/2024-18A/WE-001"
+"""
+import argparse
+import sys
+from io import BytesIO
+
+import pandas as pd
+
+from grades import ABSENT_GRADE
+from marksheet_cache import LRUCache
+
+# Grade points on the 4.0 scale; AB (absent) and N/A carry no points
+GRADE_POINTS = {
+    'A+': 4.0, 'A': 4.0, 'A-': 3.7,
+    'B+': 3.3, 'B': 3.0, 'B-': 2.7,
+    'C+': 2.3, 'C': 2.0, 'C-': 1.7,
+    'D+': 1.3, 'D': 1.0, 'E': 0.0
+}
+
+
+class StudentRecord:
+    """One student's grade entries and running grade-point totals."""
+
+    __slots__ = ('entries', 'points', 'graded', 'absent')
+
+    def __init__(self):
+        self.entries = []
+        self.points = 0.0
+        self.graded = 0
+        self.absent = 0
+
+    def add(self, course, exam, subject, grade):
+        self.entries.append((course, exam, subject, grade))
+        point = GRADE_POINTS.get(grade)
+        if point is not None:
+            self.points += point
+            self.graded += 1
+        elif grade == ABSENT_GRADE:
+            self.absent += 1
+
+    @property
+    def gpa(self):
+        return self.points / self.graded if self.graded else None
+
+
+class TranscriptIndex:
+    """Hash index of student records keyed by registration number."""
+
+    def __init__(self):
+        self.students = {}
+        self.subjects = []
+
+    def add_sheet(self, df, metadata):
+        """Fold one parsed sheet (df_students, metadata) into the index."""
+        course, exam, subject = metadata['course'], metadata['exam'], metadata['subject']
+        if subject not in self.subjects:
+            self.subjects.append(subject)
+        students = self.students
+        for reg_no, grade in zip(df['Registration Number'].to_numpy(), df['Grade'].to_numpy()):
+            record = students.get(reg_no)
+            if record is None:
+                record = students[reg_no] = StudentRecord()
+            record.add(course, exam, subject, grade)
+
+    def add_sheets(self, sheets):
+        """Fold (sheet_name, df_students, metadata) results from read_semester_workbook."""
+        for _, df, metadata in sheets:
+            self.add_sheet(df, metadata)
+
+    def __len__(self):
+        return len(self.students)
+
+    def __contains__(self, reg_no):
+        return reg_no in self.students
+
+    def transcript(self, reg_no):
+        """One student's results with grade points, in the order the sheets were added."""
+        record = self.students.get(reg_no.strip())
+        entries = record.entries if record is not None else []
+        df = pd.DataFrame(entries, columns=['Course', 'Exam', 'Subject', 'Grade'])
+        df['Grade Point'] = df['Grade'].map(GRADE_POINTS)
+        return df
+
+    def summary(self):
+        """One row per student: subject count, graded/absent counts and GPA."""
+        rows = [
+            (reg_no, len(record.entries), record.graded, record.absent,
+             round(record.gpa, 2) if record.gpa is not None else None)
+            for reg_no, record in self.students.items()
+        ]
+        return pd.DataFrame(rows, columns=['Registration Number', 'Subjects', 'Graded', 'Absent', 'GPA'])
+
+    def grade_matrix(self):
+        """Students x subjects table of grades (blank where a student has no result)."""
+        rows = {}
+        for reg_no, record in self.students.items():
+            # The last sheet wins if a subject appears twice for a student
+            rows[reg_no] = {subject: grade for _, _, subject, grade in record.entries}
+        df = pd.DataFrame.from_dict(rows, orient='index', columns=self.subjects)
+        df.index.name = 'Registration Number'
+        return df.reset_index()
+
+
+def build_transcripts(sheets):
+    """Build a TranscriptIndex from (sheet_name, df_students, metadata) results."""
+    index = TranscriptIndex()
+    index.add_sheets(sheets)
+    return index
+
+
+# Transcript indexes by the uploads they were built from, so app reruns reuse them
+transcript_indexes = LRUCache(max_entries=8)
+
+
+def generate_transcript_excel(index):
+    """Excel workbook with the GPA summary and the students x subjects grade matrix."""
+    excel_buffer = BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
+        index.summary().to_excel(writer, sheet_name='Summary', index=False)
+        index.grade_matrix().to_excel(writer, sheet_name='Grades', index=False)
+    excel_buffer.seek(0)
+    return excel_buffer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build student transcripts across many mark sheets.")
+    parser.add_argument('inputs', nargs='+', help="Directories or glob patterns of .xls/.xlsx/.pdf mark sheets or .parquet/.arrow exports")
+    parser.add_argument('-o', '--output', default='transcripts.xlsx',
+                        help="Excel file for the summary and grade matrix (default: transcripts.xlsx)")
+    parser.add_argument('--student', metavar='REG', default=None,
+                        help="Print one student's transcript instead of writing the workbook")
+    args = parser.parse_args(argv)
+
+    from app import read_semester_workbook
+    from batch import find_marksheets
+
+    paths = find_marksheets(args.inputs)
+    if not paths:
+        print("No mark sheets or exports found.")
+        return 1
+
+    index = TranscriptIndex()
+    failed = 0
+    for path in paths:
+        try:
+            sheets, _ = read_semester_workbook(path)
+        except Exception as e:
+            print(f"  [FAILED] {path}: {type(e).__name__}: {e}")
+            failed += 1
+            continue
+        index.add_sheets(sheets)
+    print(f"Indexed {len(index)} students across {len(index.subjects)} subject(s) from {len(paths)} file(s)")
+
+    if args.student:
+        transcript = index.transcript(args.student)
+        if len(transcript) == 0:
+            print(f"No results for {args.student}")
+            return 1
+        print(transcript.to_string(index=False))
+        record = index.students[args.student.strip()]
+        print(f"\nGPA: {record.gpa:.2f}" if record.gpa is not None else "\nGPA: -")
+        return 0
+
+    with open(args.output, 'wb') as f:
+        f.write(generate_transcript_excel(index).getvalue())
+    print(f"Wrote {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())